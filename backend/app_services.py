@@ -0,0 +1,100 @@
+"""
+Configuration and services shared by the WSGI (main.py) and ASGI (asgi_app.py) apps
+Importing this builds no web app and no OpenAI client; each app creates its own.
+"""
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from dotenv import load_dotenv
+
+from audio_cache import AudioCache
+from single_flight import SingleFlight
+from structured_logging import configure_logging
+from transcription_service import get_transcription_service
+from tts_warmup import warm_tts_cache
+
+load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# Synthesized speech cache (empty TTS_CACHE_DIR keeps it in memory only). The default lives
+# next to this file, like the translation memory, whatever directory the server starts from
+TTS_CACHE_MEMORY_BYTES = int(os.getenv('TTS_CACHE_MEMORY_BYTES', str(32 * 1024 * 1024)))
+TTS_CACHE_DIR = os.getenv(
+    'TTS_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tts_cache')
+) or None
+TTS_CACHE_DISK_BYTES = int(os.getenv('TTS_CACHE_DISK_BYTES', str(512 * 1024 * 1024)))
+audio_cache = AudioCache(
+    max_memory_bytes=TTS_CACHE_MEMORY_BYTES,
+    cache_dir=TTS_CACHE_DIR,
+    max_disk_bytes=TTS_CACHE_DISK_BYTES,
+)
+
+# Relay TTS audio to the client as the upstream produces it (per-request "stream" overrides)
+TTS_STREAM = os.getenv('TTS_STREAM', '').lower() in ('1', 'true', 'yes')
+TTS_STREAM_CHUNK_BYTES = int(os.getenv('TTS_STREAM_CHUNK_BYTES', '16384'))
+
+tts_flight = SingleFlight()
+
+# Speech-to-text backend for /api/voice: "remote" (OpenAI whisper-1), "local"
+# (in-process faster-whisper) or "local_fallback" (local, then remote on failure)
+STT_BACKEND = os.getenv('STT_BACKEND', 'remote').lower()
+
+# Local Whisper workers load their models on first use unless STT_PRELOAD asks for it at startup
+STT_PRELOAD = os.getenv('STT_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+
+def preload_stt():
+    """Start the local Whisper workers and load their models now (per process, after any fork)"""
+    if STT_BACKEND in ('local', 'local_fallback') and STT_PRELOAD:
+        get_transcription_service(preload=True)
+
+
+# Opt-in capture of uploaded voice audio for debugging: a sampled fraction of
+# uploads is written to uniquely named files off the request thread
+VOICE_DEBUG_CAPTURE_RATE = float(os.getenv('VOICE_DEBUG_CAPTURE_RATE', '0'))
+VOICE_DEBUG_CAPTURE_DIR = os.getenv('VOICE_DEBUG_CAPTURE_DIR', 'debug_audio')
+_debug_capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='debug-capture')
+
+
+def _write_debug_audio(path, raw):
+    try:
+        os.makedirs(VOICE_DEBUG_CAPTURE_DIR, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(raw)
+    except OSError as e:
+        logger.warning("Debug audio capture failed", extra={'path': path, 'error': str(e)})
+
+
+def capture_debug_audio(raw, filename):
+    """Maybe save an uploaded clip for debugging, without blocking the request"""
+    if VOICE_DEBUG_CAPTURE_RATE <= 0 or random.random() >= VOICE_DEBUG_CAPTURE_RATE:
+        return
+    extension = os.path.splitext(filename)[1] or '.wav'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}{extension}"
+    _debug_capture_executor.submit(_write_debug_audio, os.path.join(VOICE_DEBUG_CAPTURE_DIR, name), raw)
+
+
+# Optionally synthesize the canned suggestion phrases at startup
+TTS_WARMUP = os.getenv('TTS_WARMUP', '').lower() in ('1', 'true', 'yes')
+
+
+def start_tts_warmup(synthesize: Callable[[str, str, str], bytes], background: bool = True) -> None:
+    """Run the TTS cache warm-up with synthesize if enabled, in a background thread unless asked to block"""
+    if not TTS_WARMUP:
+        return
+    # Progress goes through logging so it stays in the JSON log stream (print is for the CLI)
+    report = logging.getLogger('tts_warmup').info
+    if background:
+        threading.Thread(target=warm_tts_cache, args=(synthesize, audio_cache), kwargs={'report': report},
+                         daemon=True).start()
+    else:
+        warm_tts_cache(synthesize, audio_cache, report=report)
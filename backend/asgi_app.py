@@ -0,0 +1,497 @@
+"""
+Async serving mode: the same routes and JSON shapes as main.py on an ASGI app
+Gemini and OpenAI calls are awaited on the event loop instead of each holding a
+worker thread, so one process can keep hundreds of voice requests in flight
+
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+from quart import Quart, request, jsonify, Response
+from quart_cors import cors
+from summarizer_service import (
+    summarize_async, summarize_stream_async, translate_to_hindi_text_async, close_async_client,
+    get_pool_stats, get_summary_path_stats, summary_cache, translation_memory, summary_flight, translation_flight,
+)
+from command_processor import classify_voice_command, command_processor
+from tts import detect_hindi_in_text
+from speech_pipeline import synthesize_pipelined_async
+from audio_cache import audio_cache_key
+from transcription_service import get_transcription_service, TranscriptionBusy, TranscriptionTimeout
+# Share configuration and the audio cache with the WSGI app
+from app_services import (
+    OPENAI_API_KEY, STT_BACKEND, TTS_STREAM, TTS_STREAM_CHUNK_BYTES, audio_cache, capture_debug_audio,
+    preload_stt, start_tts_warmup, tts_flight,
+)
+from metrics import stage_metrics, stage_timer
+from structured_logging import REQUEST_ID_HEADER, begin_request, logging_stats, request_id_var
+import asyncio
+import json
+import logging
+import os
+import time
+
+app = cors(Quart(__name__, static_url_path='', static_folder='.'))
+logger = logging.getLogger(__name__)
+
+try:
+    from openai import AsyncOpenAI
+    openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+except Exception:
+    openai_client = None
+
+
+@app.before_request
+async def bind_request_id():
+    # Each request runs in its own task, so the ID never leaks into the next one
+    begin_request(request.headers.get(REQUEST_ID_HEADER))
+
+
+@app.after_request
+async def echo_request_id(response):
+    response.headers[REQUEST_ID_HEADER] = request_id_var.get()
+    return response
+
+
+@app.before_serving
+async def start_background_jobs():
+    preload_stt()
+    warm_up_tts()
+
+
+def warm_up_tts():
+    """Run the TTS cache warm-up if enabled, synthesizing through this loop's client from a background thread"""
+    if openai_client is None:
+        return
+    loop = asyncio.get_running_loop()
+
+    def synthesize(text, voice, model):
+        return asyncio.run_coroutine_threadsafe(synthesize_mp3(text, voice, model), loop).result()
+    start_tts_warmup(synthesize)
+
+
+@app.after_serving
+async def close_clients():
+    await close_async_client()
+    if openai_client is not None:
+        await openai_client.close()
+
+
+async def _synthesize_speech(text, voice, model):
+    with stage_timer('tts'):
+        speech = await openai_client.audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text,
+            response_format="mp3"
+        )
+        return await speech.aread()
+
+
+async def _synthesize_and_cache(key, text, voice, model):
+    """Synthesize on a cache miss; concurrent requests for the same audio share one upstream call"""
+    async def synthesize():
+        audio_bytes = await _synthesize_speech(text, voice, model)
+        await asyncio.to_thread(audio_cache.put, key, audio_bytes)
+        return audio_bytes
+    return await tts_flight.do_async(key, synthesize)
+
+
+async def synthesize_mp3(text, voice, model):
+    """Return MP3 bytes for text, from the audio cache when possible"""
+    key = audio_cache_key(text, voice, model)
+    audio_bytes = await asyncio.to_thread(audio_cache.get_bytes, key)
+    if audio_bytes is None:
+        audio_bytes = await _synthesize_and_cache(key, text, voice, model)
+    return audio_bytes
+
+
+def _on_request_done(cleanup):
+    # A client that disconnects before the body is iterated cancels the request task
+    # without ever running the body generator's finally, so also clean up when it ends
+    asyncio.current_task().add_done_callback(lambda task: cleanup())
+
+
+async def _file_chunks(audio_file):
+    with audio_file:
+        while True:
+            chunk = await asyncio.to_thread(audio_file.read, TTS_STREAM_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def _audio_response(key, audio_bytes=None, audio_file=None, download_name='speech.mp3'):
+    if audio_file is not None:
+        # Stream the already-open cache file (it stays readable even if evicted meanwhile),
+        # reading each chunk off the loop
+        size = os.fstat(audio_file.fileno()).st_size
+        _on_request_done(audio_file.close)
+        response = Response(_file_chunks(audio_file), mimetype='audio/mpeg')
+        response.headers['Content-Length'] = str(size)
+    else:
+        response = Response(audio_bytes, mimetype='audio/mpeg')
+    response.headers['Content-Disposition'] = f'inline; filename={download_name}'
+    response.headers['X-Audio-Key'] = key
+    response.set_etag(key)
+    return response
+
+
+async def _streaming_speech_response(key, text, voice, model, download_name):
+    # Open the upstream response here so connection/auth errors still surface as a 500
+    started = time.perf_counter()
+    upstream = openai_client.audio.speech.with_streaming_response.create(
+        model=model,
+        voice=voice,
+        input=text,
+        response_format="mp3"
+    )
+    speech = await upstream.__aenter__()
+    closed = False
+
+    async def close_upstream():
+        nonlocal closed
+        if not closed:
+            closed = True
+            await upstream.__aexit__(None, None, None)
+
+    _on_request_done(lambda: closed or asyncio.ensure_future(close_upstream()))
+
+    async def relay():
+        # The cache writer touches disk, so each call runs in a worker thread
+        writer = await asyncio.to_thread(audio_cache.writer, key)
+        first = True
+        try:
+            async for chunk in speech.iter_bytes(TTS_STREAM_CHUNK_BYTES):
+                if first:
+                    stage_metrics.observe('tts_first_byte', time.perf_counter() - started)
+                    first = False
+                await asyncio.to_thread(writer.write, chunk)
+                yield chunk
+            await asyncio.to_thread(writer.commit)
+        finally:
+            await asyncio.to_thread(writer.abort)
+            await close_upstream()
+
+    response = Response(relay(), mimetype='audio/mpeg')
+    response.headers['Content-Disposition'] = f'inline; filename={download_name}'
+    response.headers['X-Audio-Key'] = key
+    response.set_etag(key)
+    return response
+
+
+async def cached_speech_response(text, voice, model, download_name='speech.mp3', stream=False):
+    """Speech for text as an HTTP response, synthesizing only on a cache miss"""
+    key = audio_cache_key(text, voice, model)
+    if key in request.if_none_match:
+        response = Response('', status=304)
+        response.set_etag(key)
+        return response
+    audio_bytes, audio_file = await asyncio.to_thread(audio_cache.lookup, key)
+    if audio_bytes is None and audio_file is None:
+        if stream:
+            return await _streaming_speech_response(key, text, voice, model, download_name)
+        audio_bytes = await _synthesize_and_cache(key, text, voice, model)
+    return await _audio_response(key, audio_bytes, audio_file, download_name)
+
+
+async def _remote_transcribe(raw, filename):
+    transcript = await openai_client.audio.transcriptions.create(
+        model="whisper-1",
+        file=(filename, raw)
+    )
+    return getattr(transcript, 'text', '').strip()
+
+
+async def transcribe_upload(raw, filename):
+    """Transcribe uploaded audio bytes with the configured STT backend"""
+    if STT_BACKEND in ('local', 'local_fallback'):
+        try:
+            text = (await get_transcription_service().transcribe_async(raw)).strip()
+        except Exception as e:
+            if STT_BACKEND == 'local' or openai_client is None:
+                raise
+            logger.warning("Local STT failed, falling back to remote", extra={'error': str(e)})
+            text = ''
+        if text or STT_BACKEND == 'local' or openai_client is None:
+            return text
+    return await _remote_transcribe(raw, filename)
+
+
+def _summary_request(data):
+    """(text, translate_to_hindi) from a summarize request body, or None if text is missing"""
+    if 'text' not in data or not isinstance(data['text'], str) or not data['text'].strip():
+        return None
+    return data['text'], data.get('translate_to_hindi', False)
+
+
+@app.route('/')
+async def root():
+    return await app.send_static_file('index.html')
+
+
+@app.get('/favicon.ico')
+async def favicon():
+    return ('', 204)
+
+
+@app.get('/api/health')
+async def health():
+    return jsonify({"status": "ok"})
+
+
+@app.get('/api/metrics')
+async def api_metrics():
+    """Per-stage latency histograms in the Prometheus text format"""
+    return Response(stage_metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.get('/api/stats')
+async def api_stats():
+    return jsonify({
+        "command_cache": command_processor.cache_info(),
+        "gemini_pool": get_pool_stats(),
+        "summary_cache": summary_cache.stats(),
+        "summary_paths": get_summary_path_stats(),
+        "translation_memory": translation_memory.stats(),
+        "tts_cache": audio_cache.stats(),
+        "stt_pool": get_transcription_service().stats() if STT_BACKEND in ('local', 'local_fallback') else None,
+        "stages": stage_metrics.stats(),
+        "logging": logging_stats(),
+        "coalescing": {
+            "summary": summary_flight.stats(),
+            "translation": translation_flight.stats(),
+            "tts": tts_flight.stats(),
+        },
+    })
+
+
+@app.post('/api/summarize')
+async def api_summarize():
+    parsed = _summary_request(await request.get_json(silent=True) or {})
+    if parsed is None:
+        return jsonify({"detail": "No text provided"}), 400
+    user_text, translate_to_hindi = parsed
+    try:
+        summary = await summarize_async(user_text, translate_to_hindi=translate_to_hindi)
+        return jsonify({"summary": summary, "is_hindi": translate_to_hindi})
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 500
+
+
+@app.post('/api/summarize/stream')
+async def api_summarize_stream():
+    """Stream the summary as server-sent events while Gemini generates it"""
+    parsed = _summary_request(await request.get_json(silent=True) or {})
+    if parsed is None:
+        return jsonify({"detail": "No text provided"}), 400
+    user_text, translate_to_hindi = parsed
+
+    async def events():
+        pieces = []
+        try:
+            async for piece in summarize_stream_async(user_text, translate_to_hindi=translate_to_hindi):
+                pieces.append(piece)
+                yield f"data: {json.dumps({'delta': piece}, ensure_ascii=False)}\n\n"
+            summary = ''.join(pieces).strip()
+            yield f"event: done\ndata: {json.dumps({'summary': summary, 'is_hindi': translate_to_hindi}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.post('/summarize')
+async def handle_summarization():
+    parsed = _summary_request(await request.get_json(silent=True) or {})
+    if parsed is None:
+        return jsonify({"error": "No text provided"}), 400
+    user_text, translate_to_hindi = parsed
+    summary = await summarize_async(user_text, translate_to_hindi=translate_to_hindi)
+    return jsonify({"summary": summary, "is_hindi": translate_to_hindi})
+
+
+@app.post('/api/voice')
+async def api_voice():
+    if openai_client is None and STT_BACKEND not in ('local', 'local_fallback'):
+        return jsonify({"detail": "OpenAI not configured"}), 500
+    logger.debug("Voice request received", extra={'content_length': request.content_length})
+
+    # Upload read covers parsing the multipart body and reading the clip
+    upload_started = time.perf_counter()
+    files = await request.files
+    if 'audio' not in files:
+        logger.warning("Voice request has no 'audio' file field", extra={'fields': list(files)})
+        return jsonify({"detail": "No audio key in request.files"}), 400
+    audio_file = files['audio']
+    if not audio_file or audio_file.filename == '':
+        logger.warning("Voice request audio file is empty or has no filename")
+        return jsonify({"detail": "Empty file"}), 400
+
+    try:
+        raw = audio_file.read()
+        stage_metrics.observe('upload_read', time.perf_counter() - upload_started)
+        if not raw:
+            return jsonify({"detail": "Empty audio content"}), 400
+        filename = audio_file.filename or 'voice.wav'
+        capture_debug_audio(raw, filename)
+
+        try:
+            with stage_timer('transcription'):
+                user_text = await transcribe_upload(raw, filename)
+        except TranscriptionBusy:
+            return jsonify({"detail": "Speech recognition is busy, try again shortly"}), 503
+        except TranscriptionTimeout as e:
+            return jsonify({"detail": f"STT error: {e}"}), 504
+        if not user_text:
+            return jsonify({"detail": "Transcription failed"}), 500
+        logger.debug("Transcribed voice request", extra={'audio_bytes': len(raw), 'text_chars': len(user_text)})
+
+        with stage_timer('command'):
+            command_result, is_valid = classify_voice_command(user_text)
+        with stage_timer('hindi_detect'):
+            wants_hindi = detect_hindi_in_text(user_text) or command_result.get('type') == 'hindi'
+        if is_valid:
+            return jsonify({
+                "text": user_text,
+                "command": command_result,
+                "is_valid": True,
+                "wants_hindi": wants_hindi
+            })
+        return jsonify({
+            "text": user_text,
+            "command": command_result,
+            "is_valid": False,
+            "message": "Command not recognized or too unclear",
+            "wants_hindi": wants_hindi
+        })
+    except Exception as e:
+        logger.exception("Voice request failed")
+        return jsonify({"detail": f"STT error: {e}"}), 500
+
+
+@app.post('/api/tts')
+async def api_tts():
+    if openai_client is None:
+        return jsonify({"detail": "OpenAI not configured"}), 500
+
+    data = await request.get_json(silent=True) or {}
+    text = (data.get('text') or '').strip()
+    voice = (data.get('voice') or 'alloy').strip()
+    model = (data.get('model') or 'gpt-4o-mini-tts').strip()
+    is_hindi = data.get('is_hindi', False)
+    stream = data.get('stream', TTS_STREAM)
+
+    if not text:
+        return jsonify({"detail": "No text provided"}), 400
+
+    try:
+        if not is_hindi:
+            with stage_timer('hindi_detect'):
+                is_hindi = detect_hindi_in_text(text)
+        if is_hindi:
+            voice = "nova"  # Nova voice works better with Hindi
+        return await cached_speech_response(text, voice, model, download_name='speech.mp3', stream=stream)
+    except Exception as e:
+        return jsonify({"detail": f"TTS error: {e}"}), 500
+
+
+@app.get('/api/tts/audio/<key>')
+async def api_tts_audio(key):
+    """Fetch previously synthesized audio by its X-Audio-Key (supports conditional GET)"""
+    if len(key) != 64 or any(c not in '0123456789abcdef' for c in key):
+        return jsonify({"detail": "Invalid audio key"}), 400
+    audio_bytes, audio_file = await asyncio.to_thread(audio_cache.lookup, key)
+    if audio_bytes is None and audio_file is None:
+        return jsonify({"detail": "Audio not found"}), 404
+    response = await _audio_response(key, audio_bytes, audio_file)
+    # Content-addressed, so the bytes for a key never change
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return await response.make_conditional(request)
+
+
+@app.post('/api/speak/stream')
+async def api_speak_stream():
+    """Summarize and speak in one call, streaming MP3 audio sentence by sentence"""
+    if openai_client is None:
+        return jsonify({"detail": "OpenAI not configured"}), 500
+
+    data = await request.get_json(silent=True) or {}
+    parsed = _summary_request(data)
+    if parsed is None:
+        return jsonify({"detail": "No text provided"}), 400
+    user_text, translate_to_hindi = parsed
+    voice = (data.get('voice') or 'alloy').strip()
+    model = (data.get('model') or 'gpt-4o-mini-tts').strip()
+    if translate_to_hindi:
+        voice = "nova"  # Nova voice works better with Hindi
+
+    async def synthesize(sentence):
+        return await synthesize_mp3(sentence, voice, model)
+
+    # As in main.py: take the first piece now so a failure is an error status rather than an empty 200
+    stream = summarize_stream_async(user_text, translate_to_hindi=translate_to_hindi)
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 500
+
+    async def pieces():
+        if first is not None:
+            yield first
+        async for piece in stream:
+            yield piece
+
+    async def audio():
+        async for segment in synthesize_pipelined_async(pieces(), synthesize):
+            yield segment
+
+    return Response(
+        audio(),
+        mimetype='audio/mpeg',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.post('/api/hindi-response')
+async def api_hindi_response():
+    """Handle requests that need Hindi translation and TTS"""
+    data = await request.get_json(silent=True) or {}
+    text = (data.get('text') or '').strip()
+    original_text = data.get('original_text', text)
+
+    if not text:
+        return jsonify({"detail": "No text provided"}), 400
+
+    try:
+        with stage_timer('hindi_detect'):
+            is_already_hindi = detect_hindi_in_text(text)
+        if not is_already_hindi:
+            hindi_text = await translate_to_hindi_text_async(text)
+        else:
+            hindi_text = text
+
+        if openai_client:
+            return await cached_speech_response(
+                hindi_text,
+                "nova",  # Nova voice works well with Hindi
+                "gpt-4o-mini-tts",
+                download_name='hindi_speech.mp3',
+                stream=TTS_STREAM
+            )
+        return jsonify({
+            "hindi_text": hindi_text,
+            "original_text": original_text,
+            "audio_available": False,
+            "message": "OpenAI not configured for TTS"
+        })
+    except Exception as e:
+        return jsonify({"detail": f"Hindi response error: {e}"}), 500
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
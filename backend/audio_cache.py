@@ -0,0 +1,258 @@
+"""
+Content-addressed TTS audio cache
+In-memory LRU bounded by bytes, backed by an on-disk tier of audio files that can be served directly
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from response_cache import make_cache_key
+
+
+def audio_cache_key(text: str, voice: str, model: str, response_format: str = 'mp3') -> str:
+    """Key for synthesized audio: identical inputs always produce the same key"""
+    return make_cache_key('tts', text, voice, model, response_format)
+
+
+class AudioCache:
+    def __init__(self, max_memory_bytes: int = 32 * 1024 * 1024, cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024, extension: str = 'mp3'):
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.extension = extension
+
+        # key -> audio bytes / key -> file size, least recently used first
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._scan_disk()
+
+    def _reset_after_fork(self) -> None:
+        # The lock may have been held by a parent thread at fork time; the child gets a fresh one
+        self._lock = threading.Lock()
+
+    def _scan_disk(self) -> None:
+        entries = []
+        suffix = '.' + self.extension
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(suffix):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(suffix)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{self.extension}")
+
+    def contains(self, key: str) -> bool:
+        """Check for a cached entry without touching LRU order or counters"""
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self.cache_dir) and os.path.exists(self.path_for(key))
+
+    def lookup(self, key: str) -> Tuple[Optional[bytes], Optional[BinaryIO]]:
+        """Return (audio bytes, None) from memory, (None, open file) from disk, or (None, None).
+
+        The disk file is opened before returning, so a concurrent eviction can't delete it
+        out from under the caller; the caller must close it.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data, None
+            if not self.cache_dir:
+                self.misses += 1
+                return None, None
+
+        # Open outside the lock; another worker process may also have written it since we indexed the directory
+        try:
+            audio_file = open(self.path_for(key), 'rb')
+            size = os.fstat(audio_file.fileno()).st_size
+        except OSError:
+            audio_file = None
+        with self._lock:
+            if audio_file is None:
+                if key in self._disk:
+                    self._disk_bytes -= self._disk.pop(key)
+                self.misses += 1
+                return None, None
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            else:
+                self._disk[key] = size
+                self._disk_bytes += size
+                self._evict_disk()
+            self.disk_hits += 1
+            return None, audio_file
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Return cached audio as bytes from either tier, or None"""
+        data, audio_file = self.lookup(key)
+        if audio_file is not None:
+            try:
+                with audio_file:
+                    data = audio_file.read()
+            except OSError:
+                return None
+            self._store_memory(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store audio in memory and, if configured, on disk"""
+        self._store_memory(key, data)
+        if not self.cache_dir:
+            return
+        # Write to a temp file first so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            self._commit_file(key, tmp_path, len(data))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def writer(self, key: str) -> 'AudioCacheWriter':
+        """Start an incremental write of audio for key, for streamed synthesis"""
+        return AudioCacheWriter(self, key)
+
+    def _commit_file(self, key: str, tmp_path: str, size: int) -> None:
+        os.replace(tmp_path, self.path_for(key))
+        with self._lock:
+            if key in self._disk:
+                self._disk_bytes -= self._disk.pop(key)
+            self._disk[key] = size
+            self._disk_bytes += size
+            self._evict_disk()
+
+    def _store_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_memory_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= len(self._memory.pop(key))
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+                self.memory_evictions += 1
+
+    def _evict_disk(self) -> None:
+        # Caller holds the lock (or is the constructor)
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self.disk_evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, any]:
+        """Return hit/miss/eviction counters and tier sizes"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_evictions': self.memory_evictions,
+                'disk_evictions': self.disk_evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_memory_bytes,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes,
+                'persistent': bool(self.cache_dir),
+            }
+
+
+class AudioCacheWriter:
+    """Collects streamed audio chunks and stores them in the cache on commit.
+
+    With a disk tier, chunks go straight to a temp file so memory use stays
+    flat; without one, chunks are buffered only up to the memory tier limit.
+    """
+
+    def __init__(self, cache: AudioCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        self._chunks = []
+        self._file = None
+        self._tmp_path = None
+        self._done = False
+        if cache.cache_dir:
+            fd, self._tmp_path = tempfile.mkstemp(dir=cache.cache_dir, suffix='.tmp')
+            self._file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+        elif self._chunks is not None:
+            if self.size > self.cache.max_memory_bytes:
+                self._chunks = None  # Too big to cache in memory
+            else:
+                self._chunks.append(chunk)
+
+    def commit(self) -> None:
+        """Store everything written so far under the key"""
+        if self._done:
+            return
+        self._done = True
+        if self._file is not None:
+            self._file.close()
+            try:
+                self.cache._commit_file(self.key, self._tmp_path, self.size)
+            except OSError:
+                self._remove_tmp()
+        elif self._chunks is not None:
+            self.cache._store_memory(self.key, b''.join(self._chunks))
+
+    def abort(self) -> None:
+        """Discard a partial write; no-op after commit"""
+        if self._done:
+            return
+        self._done = True
+        if self._file is not None:
+            self._file.close()
+            self._remove_tmp()
+
+    def _remove_tmp(self) -> None:
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
@@ -3,11 +3,14 @@
 Command processor for voice recognition
 Helps filter and process voice commands more effectively
 """
+import os
 import re
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 
 class VoiceCommandProcessor:
-    def __init__(self):
+    def __init__(self, cache_size: int = 1024):
         # Common voice command patterns
         self.command_patterns = {
             'help': [r'\b(help|assist|support)\b', r'\b(what can you do|how do you work)\b'],
@@ -27,11 +30,78 @@ class VoiceCommandProcessor:
             ],
         }
         
+        # Canned responses for each command type
+        self.suggestions = {
+            'help': ["I can help you navigate the app, search for information, or perform various actions."],
+            'navigation': ["I'll help you navigate to the requested section."],
+            'action': ["I'll help you perform the requested action."],
+            'search': ["I'll help you search for that information."],
+            'stop': ["Stopping current operation."],
+            'repeat': ["I'll repeat the last response."],
+            'hindi': [
+                "I'll translate the response to Hindi and speak it aloud.",
+                "मैं जवाब को हिंदी में अनुवाद करके बोलूंगा।",
+            ],
+            'general_query': ["I'll help you with that question."],
+        }
+        
         # Noise words to filter out
         self.noise_words = {
             'um', 'uh', 'ah', 'er', 'hmm', 'like', 'you know', 'actually',
             'basically', 'literally', 'so', 'well', 'right', 'okay', 'ok'
         }
+
+        # LRU cache of classifications keyed on the cleaned text
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+        self.compile_patterns()
+
+    def _reset_after_fork(self) -> None:
+        # A forked worker must not inherit the cache lock in a held state
+        self._cache_lock = threading.Lock()
+
+    def compile_patterns(self) -> None:
+        """Build the combined matcher from command_patterns.
+
+        Every pattern becomes a named alternative inside a zero-width lookahead,
+        so a single finditer over the text reports, at each position, the first
+        pattern (in table order) that matches there. Call this again after
+        editing command_patterns.
+        """
+        self._pattern_index = []
+        alternatives = []
+        for command_type, patterns in self.command_patterns.items():
+            for pattern in patterns:
+                alternatives.append(f'(?P<p{len(self._pattern_index)}>{pattern})')
+                self._pattern_index.append((command_type, pattern))
+        # Every stock pattern starts at a word boundary; checking that once up
+        # front lets the engine skip mid-word positions without trying each one
+        prefix = r'\b' if all(p.startswith(r'\b') for _, p in self._pattern_index) else ''
+        self._matcher = re.compile(prefix + '(?=' + '|'.join(alternatives) + ')', re.IGNORECASE)
+        self.clear_cache()
+
+    def clear_cache(self) -> None:
+        """Drop cached classifications and reset the hit/miss counters"""
+        with self._cache_lock:
+            self._cache.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+
+    def cache_info(self) -> Dict[str, any]:
+        """Return classification cache statistics"""
+        with self._cache_lock:
+            return {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'size': len(self._cache),
+                'max_size': self.cache_size,
+            }
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize the transcribed text"""
@@ -57,33 +127,54 @@ class VoiceCommandProcessor:
         if not cleaned_text:
             return {'type': 'none', 'confidence': 0.0, 'text': text, 'cleaned': ''}
         
-        # Check against command patterns
-        best_match = {'type': 'unknown', 'confidence': 0.0, 'text': text, 'cleaned': cleaned_text}
+        with self._cache_lock:
+            match = self._cache.get(cleaned_text)
+            if match is not None:
+                self._cache.move_to_end(cleaned_text)
+                self.cache_hits += 1
         
-        for command_type, patterns in self.command_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, cleaned_text, re.IGNORECASE):
-                    confidence = 0.8  # Base confidence
-                    
-                    # Increase confidence for exact matches
-                    if re.match(pattern, cleaned_text, re.IGNORECASE):
-                        confidence = 0.9
-                    
-                    if confidence > best_match['confidence']:
-                        best_match = {
-                            'type': command_type,
-                            'confidence': confidence,
-                            'text': text,
-                            'cleaned': cleaned_text,
-                            'pattern': pattern
-                        }
+        if match is None:
+            match = self._match_patterns(cleaned_text)
+            with self._cache_lock:
+                self.cache_misses += 1
+                if self.cache_size > 0:
+                    self._cache[cleaned_text] = match
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        
+        # The cached entry is shared, so every caller gets its own dict
+        command = {'type': match[0], 'confidence': match[1], 'text': text, 'cleaned': cleaned_text}
+        if match[2] is not None:
+            command['pattern'] = match[2]
+        return command
+    
+    def _match_patterns(self, cleaned_text: str) -> Tuple[str, float, Optional[str]]:
+        """Classify cleaned text, returning (type, confidence, pattern)"""
+        # Single pass: the first pattern anchored at the start wins with 0.9,
+        # otherwise the first pattern in table order found anywhere gets 0.8
+        first_index = None
+        anchored = False
+        for match in self._matcher.finditer(cleaned_text):
+            index = int(match.lastgroup[1:])
+            if match.start() == 0:
+                first_index = index
+                anchored = True
+                break
+            if first_index is None or index < first_index:
+                first_index = index
+                if index == 0:
+                    break
+
+        if first_index is not None:
+            command_type, pattern = self._pattern_index[first_index]
+            # Increase confidence for exact matches
+            return command_type, 0.9 if anchored else 0.8, pattern
         
         # If no pattern matches but we have substantial text, it might be a general query
-        if best_match['type'] == 'unknown' and len(cleaned_text.split()) >= 2:
-            best_match['type'] = 'general_query'
-            best_match['confidence'] = 0.5
+        if len(cleaned_text.split()) >= 2:
+            return 'general_query', 0.5, None
         
-        return best_match
+        return 'unknown', 0.0, None
     
     def is_valid_command(self, text: str, min_confidence: float = 0.3) -> bool:
         """Check if the text contains a valid command"""
@@ -92,43 +183,87 @@ class VoiceCommandProcessor:
     
     def process_voice_input(self, text: str) -> Dict[str, any]:
         """Main processing function for voice input"""
-        command = self.extract_command(text)
-        
-        # Add processing suggestions
-        suggestions = []
+        return self._add_suggestions(self.extract_command(text))
+    
+    def process_and_validate(self, text: str, min_confidence: float = 0.3) -> Tuple[Dict[str, any], bool]:
+        """Process voice input and check validity from a single classification"""
+        command = self.process_voice_input(text)
+        return command, command['confidence'] >= min_confidence
+    
+    def all_suggestions(self) -> List[str]:
+        """Every distinct canned suggestion phrase"""
+        return list(dict.fromkeys(s for phrases in self.suggestions.values() for s in phrases))
+    
+    def process_batch(self, texts: List[str], workers: Optional[int] = None,
+                      parallel_threshold: int = 5000) -> List[Dict[str, any]]:
+        """Process many voice inputs at once, returning results in input order.
+
+        Each distinct cleaned text is classified only once. When workers > 1
+        and there are at least parallel_threshold distinct texts, matching is
+        fanned out across a process pool.
+        """
+        cleaned_texts = [self.clean_text(text) for text in texts]
+        unique = list(dict.fromkeys(c for c in cleaned_texts if c))
         
-        if command['type'] == 'help':
-            suggestions.append("I can help you navigate the app, search for information, or perform various actions.")
-        elif command['type'] == 'navigation':
-            suggestions.append("I'll help you navigate to the requested section.")
-        elif command['type'] == 'action':
-            suggestions.append("I'll help you perform the requested action.")
-        elif command['type'] == 'search':
-            suggestions.append("I'll help you search for that information.")
-        elif command['type'] == 'stop':
-            suggestions.append("Stopping current operation.")
-        elif command['type'] == 'repeat':
-            suggestions.append("I'll repeat the last response.")
-        elif command['type'] == 'hindi':
-            suggestions.append("I'll translate the response to Hindi and speak it aloud.")
-            suggestions.append("मैं जवाब को हिंदी में अनुवाद करके बोलूंगा।")
-        elif command['type'] == 'general_query':
-            suggestions.append("I'll help you with that question.")
+        if workers and workers > 1 and len(unique) >= parallel_threshold:
+            from concurrent.futures import ProcessPoolExecutor
+            chunk_size = -(-len(unique) // (workers * 4))
+            chunks = [unique[i:i + chunk_size] for i in range(0, len(unique), chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                     initargs=(self.command_patterns,)) as pool:
+                matches = [m for chunk in pool.map(_match_batch_chunk, chunks) for m in chunk]
+        else:
+            matches = [self._match_patterns(c) for c in unique]
+        classified = dict(zip(unique, matches))
         
-        command['suggestions'] = suggestions
+        results = []
+        for text, cleaned_text in zip(texts, cleaned_texts):
+            if not cleaned_text:
+                command = {'type': 'none', 'confidence': 0.0, 'text': text, 'cleaned': ''}
+            else:
+                match = classified[cleaned_text]
+                command = {'type': match[0], 'confidence': match[1], 'text': text, 'cleaned': cleaned_text}
+                if match[2] is not None:
+                    command['pattern'] = match[2]
+            results.append(self._add_suggestions(command))
+        return results
+    
+    def _add_suggestions(self, command: Dict[str, any]) -> Dict[str, any]:
+        """Attach canned response suggestions for the command type"""
+        command['suggestions'] = list(self.suggestions.get(command['type'], ()))
         return command
 
+# Per-process processor used by process_batch workers
+_batch_processor = None
+
+def _init_batch_worker(command_patterns: Dict[str, List[str]]) -> None:
+    global _batch_processor
+    _batch_processor = VoiceCommandProcessor(cache_size=0)
+    _batch_processor.command_patterns = command_patterns
+    _batch_processor.compile_patterns()
+
+def _match_batch_chunk(cleaned_texts: List[str]) -> List[Tuple[str, float, Optional[str]]]:
+    return [_batch_processor._match_patterns(c) for c in cleaned_texts]
+
 # Global instance
-command_processor = VoiceCommandProcessor()
+command_processor = VoiceCommandProcessor(cache_size=int(os.getenv('COMMAND_CACHE_SIZE', '1024')))
 
 def process_voice_command(text: str) -> Dict[str, any]:
     """Process a voice command and return structured result"""
     return command_processor.process_voice_input(text)
 
+def process_voice_commands(texts: List[str], workers: Optional[int] = None) -> List[Dict[str, any]]:
+    """Process a batch of voice commands and return results in input order"""
+    return command_processor.process_batch(texts, workers=workers)
+
 def is_valid_voice_command(text: str) -> bool:
     """Check if text is a valid voice command"""
     return command_processor.is_valid_command(text)
 
+def classify_voice_command(text: str) -> Tuple[Dict[str, any], bool]:
+    """Process a voice command and return (structured result, is_valid)"""
+    return command_processor.process_and_validate(text)
+
 if __name__ == "__main__":
     # Test the command processor
     test_inputs = [
@@ -1,19 +1,47 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
-from summarizer_service import summarize, translate_to_hindi_text
-from command_processor import process_voice_command, is_valid_voice_command
+from summarizer_service import (
+    summarize, summarize_stream, translate_to_hindi_text, get_pool_stats, get_summary_path_stats,
+    summary_cache, translation_memory, summary_flight, translation_flight,
+)
+from command_processor import classify_voice_command, command_processor
 from tts import detect_hindi_in_text, play_hindi_speech
+from speech_pipeline import synthesize_pipelined
+from audio_cache import audio_cache_key
+from app_services import (
+    OPENAI_API_KEY, STT_BACKEND, TTS_STREAM, TTS_STREAM_CHUNK_BYTES, audio_cache, capture_debug_audio,
+    preload_stt, start_tts_warmup, tts_flight,
+)
+from metrics import stage_metrics, stage_timer
+from structured_logging import REQUEST_ID_HEADER, begin_request, end_request, logging_stats, request_id_var
 import os
-import io
-from dotenv import load_dotenv
-from stt import transcribe as local_transcribe
+import itertools
+import json
+import logging
+import time
+from transcription_service import get_transcription_service, TranscriptionBusy, TranscriptionTimeout
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_url_path='', static_folder='.')
 CORS(app)
 
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+@app.before_request
+def bind_request_id():
+    begin_request(request.headers.get(REQUEST_ID_HEADER))
+
+
+@app.after_request
+def echo_request_id(response):
+    response.headers[REQUEST_ID_HEADER] = request_id_var.get()
+    return response
+
+
+@app.teardown_request
+def unbind_request_id(exc):
+    end_request()
+
 
 try:
     from openai import OpenAI
@@ -22,6 +50,131 @@ except Exception:
     openai_client = None
 
 
+def _synthesize_speech(text, voice, model):
+    with stage_timer('tts'):
+        speech = openai_client.audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text,
+            response_format="mp3"
+        )
+        return speech.read()
+
+
+def _synthesize_and_cache(key, text, voice, model):
+    """Synthesize on a cache miss; concurrent requests for the same audio share one upstream call"""
+    def synthesize():
+        audio_bytes = _synthesize_speech(text, voice, model)
+        audio_cache.put(key, audio_bytes)
+        return audio_bytes
+    return tts_flight.do(key, synthesize)
+
+
+def synthesize_mp3(text, voice, model):
+    """Return MP3 bytes for text, from the audio cache when possible"""
+    key = audio_cache_key(text, voice, model)
+    audio_bytes = audio_cache.get_bytes(key)
+    if audio_bytes is None:
+        audio_bytes = _synthesize_and_cache(key, text, voice, model)
+    return audio_bytes
+
+
+def _audio_response(key, audio_bytes=None, audio_file=None, download_name='speech.mp3'):
+    if audio_file is not None:
+        # Stream the already-open cache file; it stays readable even if evicted meanwhile
+        size = os.fstat(audio_file.fileno()).st_size
+        response = send_file(audio_file, mimetype='audio/mpeg', as_attachment=False,
+                             download_name=download_name, etag=key, conditional=False)
+        response.content_length = size
+        response = response.make_conditional(request, accept_ranges=True, complete_length=size)
+    else:
+        response = Response(audio_bytes, mimetype='audio/mpeg')
+        response.headers['Content-Disposition'] = f'inline; filename={download_name}'
+        response.set_etag(key)
+    response.headers['X-Audio-Key'] = key
+    return response
+
+
+def _streaming_speech_response(key, text, voice, model, download_name):
+    # Open the upstream response here so connection/auth errors still surface as a 500
+    started = time.perf_counter()
+    upstream = openai_client.audio.speech.with_streaming_response.create(
+        model=model,
+        voice=voice,
+        input=text,
+        response_format="mp3"
+    )
+    speech = upstream.__enter__()
+    closed = []
+
+    def close():
+        if not closed:
+            closed.append(True)
+            upstream.__exit__(None, None, None)
+
+    def relay():
+        writer = audio_cache.writer(key)
+        first = True
+        try:
+            for chunk in speech.iter_bytes(TTS_STREAM_CHUNK_BYTES):
+                if first:
+                    stage_metrics.observe('tts_first_byte', time.perf_counter() - started)
+                    first = False
+                writer.write(chunk)
+                yield chunk
+            writer.commit()
+        finally:
+            writer.abort()
+            close()
+
+    response = Response(stream_with_context(relay()), mimetype='audio/mpeg')
+    # Also release the upstream if the client disconnects before streaming starts
+    response.call_on_close(close)
+    response.headers['Content-Disposition'] = f'inline; filename={download_name}'
+    response.headers['X-Audio-Key'] = key
+    response.set_etag(key)
+    return response
+
+
+def cached_speech_response(text, voice, model, download_name='speech.mp3', stream=False):
+    """Speech for text as an HTTP response, synthesizing only on a cache miss"""
+    key = audio_cache_key(text, voice, model)
+    if key in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(key)
+        return response
+    audio_bytes, audio_file = audio_cache.lookup(key)
+    if audio_bytes is None and audio_file is None:
+        if stream:
+            return _streaming_speech_response(key, text, voice, model, download_name)
+        audio_bytes = _synthesize_and_cache(key, text, voice, model)
+    return _audio_response(key, audio_bytes, audio_file, download_name)
+
+
+def _remote_transcribe(raw, filename):
+    # Pass the upload buffer as-is; the filename lets the SDK infer content type/extension
+    transcript = openai_client.audio.transcriptions.create(
+        model="whisper-1",
+        file=(filename, raw)
+    )
+    return getattr(transcript, 'text', '').strip()
+
+
+def transcribe_upload(raw, filename):
+    """Transcribe uploaded audio bytes with the configured STT backend"""
+    if STT_BACKEND in ('local', 'local_fallback'):
+        try:
+            text = get_transcription_service().transcribe(raw).strip()
+        except Exception as e:
+            if STT_BACKEND == 'local' or openai_client is None:
+                raise
+            logger.warning("Local STT failed, falling back to remote", extra={'error': str(e)})
+            text = ''
+        if text or STT_BACKEND == 'local' or openai_client is None:
+            return text
+    return _remote_transcribe(raw, filename)
+
+
 @app.route('/')
 def root():
     return app.send_static_file('index.html')
@@ -37,6 +190,32 @@ def health():
     return jsonify({"status": "ok"})
 
 
+@app.get('/api/metrics')
+def api_metrics():
+    """Per-stage latency histograms in the Prometheus text format"""
+    return Response(stage_metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.get('/api/stats')
+def api_stats():
+    return jsonify({
+        "command_cache": command_processor.cache_info(),
+        "gemini_pool": get_pool_stats(),
+        "summary_cache": summary_cache.stats(),
+        "summary_paths": get_summary_path_stats(),
+        "translation_memory": translation_memory.stats(),
+        "tts_cache": audio_cache.stats(),
+        "stt_pool": get_transcription_service().stats() if STT_BACKEND in ('local', 'local_fallback') else None,
+        "stages": stage_metrics.stats(),
+        "logging": logging_stats(),
+        "coalescing": {
+            "summary": summary_flight.stats(),
+            "translation": translation_flight.stats(),
+            "tts": tts_flight.stats(),
+        },
+    })
+
+
 @app.post('/api/summarize')
 def api_summarize():
     data = request.get_json(silent=True) or {}
@@ -51,6 +230,33 @@ def api_summarize():
         return jsonify({"detail": str(e)}), 500
 
 
+@app.post('/api/summarize/stream')
+def api_summarize_stream():
+    """Stream the summary as server-sent events while Gemini generates it"""
+    data = request.get_json(silent=True) or {}
+    if 'text' not in data or not isinstance(data['text'], str) or not data['text'].strip():
+        return jsonify({"detail": "No text provided"}), 400
+    user_text = data['text']
+    translate_to_hindi = data.get('translate_to_hindi', False)
+
+    def events():
+        pieces = []
+        try:
+            for piece in summarize_stream(user_text, translate_to_hindi=translate_to_hindi):
+                pieces.append(piece)
+                yield f"data: {json.dumps({'delta': piece}, ensure_ascii=False)}\n\n"
+            summary = ''.join(pieces).strip()
+            yield f"event: done\ndata: {json.dumps({'summary': summary, 'is_hindi': translate_to_hindi}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.post('/summarize')
 def handle_summarization():
     data = request.get_json(silent=True) or {}
@@ -64,53 +270,51 @@ def handle_summarization():
 
 @app.post('/api/voice')
 def api_voice():
-    if openai_client is None:
+    if openai_client is None and STT_BACKEND not in ('local', 'local_fallback'):
         return jsonify({"detail": "OpenAI not configured"}), 500
-    print("--- /api/voice endpoint hit ---")
+    logger.debug("Voice request received", extra={'content_length': request.content_length})
 
+    # Upload read covers parsing the multipart body and reading the clip
+    upload_started = time.perf_counter()
     if 'audio' not in request.files:
-        print(">>> ERROR: The key 'audio' was NOT found in the request files.")
-        print(">>> Make sure your front-end is sending a file with the field name 'audio'.")
+        logger.warning("Voice request has no 'audio' file field", extra={'fields': list(request.files)})
         return jsonify({"detail": "No audio key in request.files"}), 400
 
-    print("1. Found 'audio' key in the request.")
     audio_file = request.files['audio']
 
     if not audio_file or audio_file.filename == '':
-        print(">>> ERROR: The audio file is empty or has no filename.")
+        logger.warning("Voice request audio file is empty or has no filename")
         return jsonify({"detail": "Empty file"}), 400
 
-    print("2. Audio file seems valid. Proceeding to save and process.")
-
     try:
-        debug_audio_path = "uploaded_audio.wav" 
-        audio_file.save(debug_audio_path)
-        print(f"Saved uploaded audio for debugging at: {debug_audio_path}")
-        audio_file.seek(0)
         raw = audio_file.read()
+        stage_metrics.observe('upload_read', time.perf_counter() - upload_started)
         if not raw:
             return jsonify({"detail": "Empty audio content"}), 400
-        buf = io.BytesIO(raw)
-        # Give BytesIO a name so the SDK infers content type/extension
-        buf.name = audio_file.filename or 'voice.wav'
-        buf.seek(0)
-
-        transcript = openai_client.audio.transcriptions.create(
-            model="whisper-1",
-            file=buf
-        )
-        user_text = getattr(transcript, 'text', '').strip()
+        filename = audio_file.filename or 'voice.wav'
+        capture_debug_audio(raw, filename)
+
+        try:
+            with stage_timer('transcription'):
+                user_text = transcribe_upload(raw, filename)
+        except TranscriptionBusy:
+            return jsonify({"detail": "Speech recognition is busy, try again shortly"}), 503
+        except TranscriptionTimeout as e:
+            return jsonify({"detail": f"STT error: {e}"}), 504
         if not user_text:
             return jsonify({"detail": "Transcription failed"}), 500
+        logger.debug("Transcribed voice request", extra={'audio_bytes': len(raw), 'text_chars': len(user_text)})
 
-        # Process the voice command
-        command_result = process_voice_command(user_text)
+        # Process the voice command (classified once, validity included)
+        with stage_timer('command'):
+            command_result, is_valid = classify_voice_command(user_text)
         
         # Check if user wants Hindi response
-        wants_hindi = detect_hindi_in_text(user_text) or command_result.get('type') == 'hindi'
+        with stage_timer('hindi_detect'):
+            wants_hindi = detect_hindi_in_text(user_text) or command_result.get('type') == 'hindi'
         
         # Only return valid commands to reduce "random things" processing
-        if is_valid_voice_command(user_text):
+        if is_valid:
             return jsonify({
                 "text": user_text,
                 "command": command_result,
@@ -126,6 +330,7 @@ def api_voice():
                 "wants_hindi": wants_hindi
             })
     except Exception as e:
+        logger.exception("Voice request failed")
         # Surface full error for easier debugging in dev
         return jsonify({"detail": f"STT error: {e}"}), 500
 
@@ -140,6 +345,7 @@ def api_tts():
     voice = (data.get('voice') or 'alloy').strip()
     model = (data.get('model') or 'gpt-4o-mini-tts').strip()
     is_hindi = data.get('is_hindi', False)
+    stream = data.get('stream', TTS_STREAM)
     
     if not text:
         return jsonify({"detail": "No text provided"}), 400
@@ -147,7 +353,8 @@ def api_tts():
     try:
         # Auto-detect Hindi if not explicitly set
         if not is_hindi:
-            is_hindi = detect_hindi_in_text(text)
+            with stage_timer('hindi_detect'):
+                is_hindi = detect_hindi_in_text(text)
         
         # Adjust voice for Hindi text
         if is_hindi:
@@ -155,20 +362,65 @@ def api_tts():
         
         # For Hindi text, we might need to adjust voice or model settings
         # OpenAI TTS supports multiple languages including Hindi
-        speech = openai_client.audio.speech.create(
-            model=model,
-            voice=voice,
-            input=text,
-            response_format="mp3"
-        )
-        audio_bytes = speech.read()
-        buf = io.BytesIO(audio_bytes)
-        buf.seek(0)
-        return send_file(buf, mimetype='audio/mpeg', as_attachment=False, download_name='speech.mp3')
+        return cached_speech_response(text, voice, model, download_name='speech.mp3', stream=stream)
     except Exception as e:
         return jsonify({"detail": f"TTS error: {e}"}), 500
 
 
+@app.get('/api/tts/audio/<key>')
+def api_tts_audio(key):
+    """Fetch previously synthesized audio by its X-Audio-Key (supports conditional GET)"""
+    if len(key) != 64 or any(c not in '0123456789abcdef' for c in key):
+        return jsonify({"detail": "Invalid audio key"}), 400
+    audio_bytes, audio_file = audio_cache.lookup(key)
+    if audio_bytes is None and audio_file is None:
+        return jsonify({"detail": "Audio not found"}), 404
+    response = _audio_response(key, audio_bytes, audio_file)
+    # Content-addressed, so the bytes for a key never change
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response.make_conditional(request)
+
+
+@app.post('/api/speak/stream')
+def api_speak_stream():
+    """Summarize and speak in one call, streaming MP3 audio sentence by sentence"""
+    if openai_client is None:
+        return jsonify({"detail": "OpenAI not configured"}), 500
+
+    data = request.get_json(silent=True) or {}
+    if 'text' not in data or not isinstance(data['text'], str) or not data['text'].strip():
+        return jsonify({"detail": "No text provided"}), 400
+    user_text = data['text']
+    translate_to_hindi = data.get('translate_to_hindi', False)
+    voice = (data.get('voice') or 'alloy').strip()
+    model = (data.get('model') or 'gpt-4o-mini-tts').strip()
+    if translate_to_hindi:
+        voice = "nova"  # Nova voice works better with Hindi
+
+    def synthesize(sentence):
+        return synthesize_mp3(sentence, voice, model)
+
+    # The generator only checks the key and calls Gemini once iterated: take the
+    # first piece now so a failure is an error status rather than an empty 200
+    pieces = summarize_stream(user_text, translate_to_hindi=translate_to_hindi)
+    try:
+        first = next(pieces, None)
+    except Exception as e:
+        return jsonify({"detail": str(e)}), 500
+    if first is not None:
+        pieces = itertools.chain([first], pieces)
+
+    def audio():
+        for segment in synthesize_pipelined(pieces, synthesize):
+            yield segment
+
+    return Response(
+        stream_with_context(audio()),
+        mimetype='audio/mpeg',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.post('/api/hindi-response')
 def api_hindi_response():
     """Handle requests that need Hindi translation and TTS"""
@@ -181,7 +433,8 @@ def api_hindi_response():
 
     try:
         # Translate to Hindi if not already in Hindi
-        is_already_hindi = detect_hindi_in_text(text)
+        with stage_timer('hindi_detect'):
+            is_already_hindi = detect_hindi_in_text(text)
         if not is_already_hindi:
             hindi_text = translate_to_hindi_text(text)
         else:
@@ -189,21 +442,12 @@ def api_hindi_response():
         
         # Generate TTS for Hindi text
         if openai_client:
-            speech = openai_client.audio.speech.create(
-                model="gpt-4o-mini-tts",
-                voice="nova",  # Nova voice works well with Hindi
-                input=hindi_text,
-                response_format="mp3"
-            )
-            audio_bytes = speech.read()
-            buf = io.BytesIO(audio_bytes)
-            buf.seek(0)
-            
-            return send_file(
-                buf, 
-                mimetype='audio/mpeg', 
-                as_attachment=False, 
-                download_name='hindi_speech.mp3'
+            return cached_speech_response(
+                hindi_text,
+                "nova",  # Nova voice works well with Hindi
+                "gpt-4o-mini-tts",
+                download_name='hindi_speech.mp3',
+                stream=TTS_STREAM
             )
         else:
             return jsonify({
@@ -217,5 +461,24 @@ def api_hindi_response():
         return jsonify({"detail": f"Hindi response error: {e}"}), 500
 
 
+def warm_up_tts(background=True):
+    """Run the TTS cache warm-up if enabled, in a background thread unless asked to block"""
+    if openai_client is not None:
+        start_tts_warmup(synthesize_mp3, background)
+
+
+def _reset_after_fork():
+    # The OpenAI client's connection pool can't be shared with the parent process
+    global openai_client
+    if openai_client is not None:
+        openai_client = OpenAI(api_key=OPENAI_API_KEY)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    import sys
+    from serve import run
+    run(sys.modules[__name__])
\ No newline at end of file
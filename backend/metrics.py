@@ -0,0 +1,237 @@
+"""
+Per-stage latency histograms
+Request-handling stages time themselves into fixed-bucket histograms, exported in the
+Prometheus text format with p50/p95/p99 estimated from the buckets. With several worker
+processes, each keeps a snapshot file in a shared directory and scrapes sum them all.
+"""
+import bisect
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Directory shared by worker processes (serve.py picks a fresh one when it forks several)
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+# Seconds between a process's snapshot writes; scrapes also write the answering process's own
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+# Upper bounds in seconds, from sub-millisecond regex work up to slow upstream calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0,
+)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # counts[i] holds observations in (buckets[i-1], buckets[i]]; the last slot is +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Dict[str, any]:
+        """Return a consistent copy of the buckets, totals and estimated quantiles"""
+        with self._lock:
+            counts = list(self.counts)
+            count, total, observed_max = self.count, self.sum, self.max
+        return _snapshot(self.buckets, counts, count, total, observed_max)
+
+
+def _quantile(buckets, q: float, counts: List[int], count: int, observed_max: float) -> float:
+    # Linear interpolation inside the bucket holding the q-th observation
+    rank = q * count
+    seen = 0
+    for i, in_bucket in enumerate(counts):
+        if in_bucket and seen + in_bucket >= rank:
+            lower = buckets[i - 1] if i > 0 else 0.0
+            upper = buckets[i] if i < len(buckets) else observed_max
+            return min(lower + (upper - lower) * (rank - seen) / in_bucket, observed_max)
+        seen += in_bucket
+    return observed_max
+
+
+def _snapshot(buckets, counts: List[int], count: int, total: float, observed_max: float) -> Dict[str, any]:
+    return {
+        'counts': counts,
+        'count': count,
+        'sum': total,
+        'max': observed_max,
+        'quantiles': {q: _quantile(buckets, q, counts, count, observed_max) if count else 0.0 for q in QUANTILES},
+    }
+
+
+class StageMetrics:
+    def __init__(self, name: str = 'voice_stage_duration_seconds', buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.shared_dir = None
+        self._snapshot_path = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=self._flush_before_fork, after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        # Any of these locks may have been mid-observe in a parent thread at fork time
+        self._lock = threading.Lock()
+        for histogram in self._histograms.values():
+            histogram._lock = threading.Lock()
+        if self.shared_dir:
+            # The parent's observations are in the parent's file; count only our own from here
+            self._histograms = {}
+            self._start_sharing()
+
+    def share_across_processes(self, directory: str) -> None:
+        """Keep a snapshot file in directory and answer scrapes with every process's totals"""
+        os.makedirs(directory, exist_ok=True)
+        self.shared_dir = directory
+        self._start_sharing()
+
+    def _start_sharing(self) -> None:
+        # A fresh name per process, so a recycled pid never overwrites a dead worker's totals
+        self._snapshot_path = os.path.join(self.shared_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+        self._write_snapshot()
+        threading.Thread(target=self._flush_periodically, args=(self._snapshot_path,), daemon=True).start()
+
+    def _flush_before_fork(self) -> None:
+        if self.shared_dir:
+            self._write_snapshot()
+
+    def _flush_periodically(self, path: str) -> None:
+        # Stops if sharing restarts under a new file name
+        while self._snapshot_path == path:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        data = {stage: histogram.snapshot() for stage, histogram in self._items()}
+        entry = {stage: {key: snap[key] for key in ('counts', 'count', 'sum', 'max')} for stage, snap in data.items()}
+        try:
+            # Write then rename, so a scrape never reads a half-written file
+            fd, tmp_path = tempfile.mkstemp(dir=self.shared_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'buckets': self.buckets, 'stages': entry}, f)
+            os.replace(tmp_path, self._snapshot_path)
+        except OSError as e:
+            logger.warning("Metrics snapshot write failed", extra={'path': self._snapshot_path, 'error': str(e)})
+
+    def _shared_snapshots(self) -> List[tuple]:
+        # Sum every process's latest snapshot, including workers that have since exited,
+        # so totals never go backwards between scrapes answered by different workers
+        self._write_snapshot()
+        merged = {}
+        for path in glob.glob(os.path.join(self.shared_dir, '*.json')):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if tuple(data.get('buckets', ())) != self.buckets:
+                continue
+            for stage, snap in data['stages'].items():
+                total = merged.setdefault(stage, {'counts': [0] * (len(self.buckets) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0})
+                total['counts'] = [a + b for a, b in zip(total['counts'], snap['counts'])]
+                total['count'] += snap['count']
+                total['sum'] += snap['sum']
+                total['max'] = max(total['max'], snap['max'])
+        return [(stage, _snapshot(self.buckets, total['counts'], total['count'], total['sum'], total['max']))
+                for stage, total in sorted(merged.items())]
+
+    def _snapshots(self) -> List[tuple]:
+        if self.shared_dir:
+            return self._shared_snapshots()
+        return [(stage, histogram.snapshot()) for stage, histogram in self._items()]
+
+    def _histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self._histogram(stage).observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the body of a with block as one observation of stage, even if it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def _items(self) -> List[tuple]:
+        # observe() may add a stage from another thread while we iterate
+        with self._lock:
+            return sorted(self._histograms.items())
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count and mean/p50/p95/p99/max in milliseconds"""
+        result = {}
+        for stage, snap in self._snapshots():
+            result[stage] = {
+                'count': snap['count'],
+                'mean_ms': snap['sum'] / snap['count'] * 1000 if snap['count'] else 0.0,
+                'p50_ms': snap['quantiles'][0.5] * 1000,
+                'p95_ms': snap['quantiles'][0.95] * 1000,
+                'p99_ms': snap['quantiles'][0.99] * 1000,
+                'max_ms': snap['max'] * 1000,
+            }
+        return result
+
+    def render_prometheus(self) -> str:
+        """Histograms plus estimated quantile gauges in the Prometheus text exposition format"""
+        snapshots = self._snapshots()
+        lines = [
+            f"# HELP {self.name} Time spent in each request-handling stage",
+            f"# TYPE {self.name} histogram",
+        ]
+        for stage, snap in snapshots:
+            cumulative = 0
+            for bound, in_bucket in zip(self.buckets, snap['counts']):
+                cumulative += in_bucket
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{stage="{stage}",le="+Inf"}} {snap["count"]}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {snap["sum"]}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {snap["count"]}')
+        quantile_name = self.name.replace('_seconds', '_quantile_seconds')
+        lines += [
+            f"# HELP {quantile_name} p50/p95/p99 estimated from the {self.name} buckets",
+            f"# TYPE {quantile_name} gauge",
+        ]
+        for stage, snap in snapshots:
+            for q, value in snap['quantiles'].items():
+                lines.append(f'{quantile_name}{{stage="{stage}",quantile="{q}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every module in the process
+stage_metrics = StageMetrics()
+if METRICS_DIR:
+    stage_metrics.share_across_processes(METRICS_DIR)
+
+
+def stage_timer(stage: str):
+    """Context manager timing one stage into the shared histograms"""
+    return stage_metrics.time(stage)
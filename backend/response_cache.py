@@ -0,0 +1,164 @@
+"""
+Content-addressed response cache
+In-memory LRU with TTL, optionally backed by SQLite so entries survive restarts
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def make_cache_key(*parts) -> str:
+    """Hash JSON-serializable parts into a stable hex key"""
+    raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 3600, db_path: Optional[str] = None,
+                 max_disk_entries: int = 10000, prune_every: int = 100):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+
+        # key -> (stored_at, value)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        # SQLite work has its own lock so memory hits never wait behind disk I/O
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._writes_since_prune = 0
+        if db_path:
+            self._connect()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        # Neither a lock held at fork time nor a SQLite connection may be carried into the child
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        if self.db_path:
+            self._connect()
+
+    def _connect(self) -> None:
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS responses '
+            '(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at)')
+        self._prune(time.time())
+
+    def _prune(self, now: float) -> None:
+        # Caller holds _db_lock (or is connecting); drop expired rows, then the oldest past the limit
+        deleted = 0
+        if self.ttl > 0:
+            deleted += self._db.execute('DELETE FROM responses WHERE stored_at < ?', (now - self.ttl,)).rowcount
+        if self.max_disk_entries > 0:
+            deleted += self._db.execute(
+                'DELETE FROM responses WHERE key IN '
+                '(SELECT key FROM responses ORDER BY stored_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_disk_entries,)
+            ).rowcount
+        self._db.commit()
+        self._writes_since_prune = 0
+        self.disk_evictions += deleted
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - stored_at > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        row = None
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute(
+                    'SELECT stored_at, value FROM responses WHERE key = ?', (key,)
+                ).fetchone()
+                if row is not None and self._expired(row[0], now):
+                    self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    self._db.commit()
+                    row = None
+
+        with self._lock:
+            if row is not None:
+                self._store_memory(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[1]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store value under key in memory and, if configured, on disk"""
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, now, value)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO responses (key, stored_at, value) VALUES (?, ?, ?)',
+                    (key, now, value)
+                )
+                self._db.commit()
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self.prune_every:
+                    self._prune(now)
+
+    def _store_memory(self, key: str, stored_at: float, value: str) -> None:
+        # Caller holds _lock
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute('DELETE FROM responses')
+                self._db.commit()
+
+    def stats(self) -> Dict[str, any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_evictions': self.disk_evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'max_disk_entries': self.max_disk_entries,
+                'ttl': self.ttl,
+                'persistent': self._db is not None,
+            }
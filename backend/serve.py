@@ -0,0 +1,114 @@
+"""
+Production server for the Flask app: gunicorn with the app preloaded and forked into workers
+The app, caches, translation memory and compiled patterns are built once in the master and
+shared copy-on-write; sockets, SQLite handles and thread pools are rebuilt in each worker.
+
+    python serve.py            (or python main.py; FLASK_DEBUG=1 runs the dev server instead)
+"""
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+
+SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.getenv('PORT', '5000'))
+# Local Whisper loads STT_WORKERS models in every worker after the fork, each running
+# CPU-bound inferences, so with it on a single worker is the default
+LOCAL_STT = os.getenv('STT_BACKEND', 'remote').lower() in ('local', 'local_fallback')
+# Worker processes and threads per worker; threads mostly wait on Gemini/OpenAI
+SERVER_WORKERS = int(os.getenv('WEB_CONCURRENCY') or (1 if LOCAL_STT else os.cpu_count() or 1))
+SERVER_THREADS = int(os.getenv('SERVER_THREADS', '32'))
+SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', '5'))
+# Must exceed the 25 s upstream timeouts so a slow answer isn't killed mid-request
+SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', '60'))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', '30'))
+SERVER_BACKLOG = int(os.getenv('SERVER_BACKLOG', '2048'))
+# Recycle workers after this many requests (0 disables), with jitter so they don't restart together
+SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', '0'))
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', '100'))
+SERVER_LOG_LEVEL = os.getenv('SERVER_LOG_LEVEL', 'info')
+
+
+def split_whisper_threads(workers: int) -> None:
+    """Give each local Whisper model a share of the cores so every worker's pool fits together"""
+    import stt
+    from transcription_service import STT_WORKERS
+    if not LOCAL_STT or stt.WHISPER_CPU_THREADS:
+        return
+    share = (os.cpu_count() or 1) // (workers * max(1, STT_WORKERS))
+    # Below CTranslate2's default of 4 threads per model, the models would oversubscribe the CPU
+    if share < 4:
+        stt.WHISPER_CPU_THREADS = max(1, share)
+
+
+def server_options(app_module) -> dict:
+    """gunicorn settings from the SERVER_* / WEB_CONCURRENCY / PORT environment"""
+    workers = max(1, SERVER_WORKERS)
+
+    def post_fork(server, worker):
+        split_whisper_threads(workers)
+        app_module.preload_stt()
+
+    return {
+        'bind': f"{SERVER_HOST}:{SERVER_PORT}",
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': max(1, SERVER_THREADS),
+        'keepalive': SERVER_KEEPALIVE,
+        'timeout': SERVER_TIMEOUT,
+        'graceful_timeout': SERVER_GRACEFUL_TIMEOUT,
+        'backlog': SERVER_BACKLOG,
+        'max_requests': SERVER_MAX_REQUESTS,
+        'max_requests_jitter': SERVER_MAX_REQUESTS_JITTER if SERVER_MAX_REQUESTS else 0,
+        'preload_app': True,
+        'loglevel': SERVER_LOG_LEVEL,
+        'accesslog': '-',
+        'post_fork': post_fork,
+    }
+
+
+def run(app_module) -> None:
+    """Serve app_module.app until SIGINT/SIGTERM, letting in-flight requests finish"""
+    if os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes'):
+        app_module.preload_stt()
+        app_module.warm_up_tts()
+        app_module.app.run(host=SERVER_HOST, port=SERVER_PORT, debug=True)
+        return
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # gunicorn is POSIX-only; fall back to the threaded server without the debugger
+        logging.getLogger(__name__).warning("gunicorn not available, using the Flask threaded server")
+        app_module.preload_stt()
+        app_module.warm_up_tts()
+        app_module.app.run(host=SERVER_HOST, port=SERVER_PORT, threaded=True)
+        return
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in server_options(app_module).items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app_module.app
+
+    # Each worker counts its own stage timings; a shared directory lets any of them
+    # answer /api/metrics with the totals of all of them
+    from metrics import METRICS_DIR, stage_metrics
+    if SERVER_WORKERS > 1 and not METRICS_DIR:
+        metrics_dir = tempfile.mkdtemp(prefix='voice-metrics-')
+        stage_metrics.share_across_processes(metrics_dir)
+        # Workers inherit atexit handlers; only the master removes the directory
+        master_pid = os.getpid()
+        atexit.register(lambda: os.getpid() == master_pid and shutil.rmtree(metrics_dir, ignore_errors=True))
+
+    # Warm the audio cache before forking so every worker starts with it
+    app_module.warm_up_tts(background=False)
+    Server().run()
+
+
+if __name__ == "__main__":
+    import main
+    run(main)
@@ -0,0 +1,83 @@
+"""
+Single-flight request coalescing
+Concurrent calls with the same key share one execution and its result (or exception)
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        # Calls in flight at fork time belong to parent threads (or its event loop) that the
+        # child doesn't have; waiting on them would block forever
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], any]):
+        """Run fn() for key, or wait for the identical call already in flight on another thread"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                self.executed += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            return call.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable]):
+        """Await fn() for key, sharing one task among concurrent callers on the event loop.
+
+        The shared task is shielded, so one caller going away doesn't cancel it for the rest.
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(fn())
+                task.add_done_callback(lambda done: self._finish_task(key, done))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish_task(self, key: str, task: asyncio.Future) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # Mark it retrieved even if every caller went away
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many calls ran upstream and how many joined one already in flight"""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls) + len(self._tasks),
+            }
@@ -0,0 +1,147 @@
+"""
+Sentence-pipelined speech synthesis
+Turns a stream of text pieces into MP3 segments, synthesizing each sentence as soon as it is complete
+"""
+import asyncio
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Iterator
+
+# Number of sentences synthesized concurrently across all requests
+TTS_PIPELINE_WORKERS = int(os.getenv("TTS_PIPELINE_WORKERS", "4"))
+
+# A sentence ends at ., !, ? or the Devanagari danda followed by whitespace
+SENTENCE_END = re.compile(r'[.!?।]+\s+')
+
+_executor = None
+
+
+def _reset_after_fork() -> None:
+    # Pool threads don't survive fork
+    global _executor
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=TTS_PIPELINE_WORKERS, thread_name_prefix='tts-pipeline')
+    return _executor
+
+
+def _split_sentences(pending: str) -> tuple:
+    """Split buffered text into (complete sentences, unfinished remainder)"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(pending):
+        sentence = pending[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, pending[start:]
+
+
+def iter_sentences(pieces: Iterable[str]) -> Iterator[str]:
+    """Regroup streamed text pieces into complete sentences"""
+    pending = ''
+    for piece in pieces:
+        sentences, pending = _split_sentences(pending + piece)
+        yield from sentences
+    if pending.strip():
+        yield pending.strip()
+
+
+async def aiter_sentences(pieces: AsyncIterable[str]) -> AsyncIterator[str]:
+    """Async iter_sentences()"""
+    pending = ''
+    async for piece in pieces:
+        sentences, pending = _split_sentences(pending + piece)
+        for sentence in sentences:
+            yield sentence
+    if pending.strip():
+        yield pending.strip()
+
+
+def synthesize_pipelined(pieces: Iterable[str], synthesize: Callable[[str], bytes],
+                         max_pending: int = TTS_PIPELINE_WORKERS) -> Iterator[bytes]:
+    """Yield audio for each sentence in order while later sentences are still being generated.
+
+    A reader thread consumes the text stream and queues one synthesis job per
+    sentence; at most max_pending jobs from one request wait at a time, so a
+    long answer can't monopolize the shared worker pool.
+    """
+    executor = get_executor()
+    jobs = queue.Queue(maxsize=max_pending)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        # Give up once the consumer has gone away
+        while not stopped.is_set():
+            try:
+                jobs.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read_sentences():
+        try:
+            for sentence in iter_sentences(pieces):
+                future = executor.submit(synthesize, sentence)
+                if not put(future):
+                    future.cancel()
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(None)
+
+    threading.Thread(target=read_sentences, daemon=True).start()
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            if isinstance(job, Exception):
+                raise job
+            yield job.result()
+    finally:
+        stopped.set()
+
+
+async def synthesize_pipelined_async(pieces: AsyncIterable[str], synthesize: Callable[[str], Awaitable[bytes]],
+                                     max_pending: int = TTS_PIPELINE_WORKERS) -> AsyncIterator[bytes]:
+    """Async synthesize_pipelined(): one synthesis task per sentence, at most max_pending ahead"""
+    jobs = asyncio.Queue(maxsize=max_pending)
+
+    async def read_sentences():
+        try:
+            async for sentence in aiter_sentences(pieces):
+                await jobs.put(asyncio.ensure_future(synthesize(sentence)))
+        except Exception as e:
+            await jobs.put(e)
+            return
+        await jobs.put(None)
+
+    reader = asyncio.ensure_future(read_sentences())
+    try:
+        while True:
+            job = await jobs.get()
+            if job is None:
+                return
+            if isinstance(job, Exception):
+                raise job
+            yield await job
+    finally:
+        reader.cancel()
+        while not jobs.empty():
+            job = jobs.get_nowait()
+            if isinstance(job, asyncio.Future):
+                job.cancel()
@@ -0,0 +1,164 @@
+"""
+Structured JSON logging off the request path
+Records are queued by the calling thread and formatted/written by a background listener,
+tagged with the current request's correlation ID; debug events are sampled per request.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+# Root level, plus per-logger overrides like "summarizer_service=DEBUG,httpx=WARNING"
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+# Fraction of requests whose debug events are kept (when LOG_LEVEL allows debug at all)
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+# Records waiting for the writer thread; past this they are dropped rather than blocking
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Accept a caller's ID only if it is short and safe to echo back
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+_debug_sampled_var = contextvars.ContextVar('debug_sampled', default=None)
+
+# LogRecord attributes that aren't user-supplied extra fields
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+
+def begin_request(incoming_id: Optional[str] = None) -> str:
+    """Bind a correlation ID (the caller's if valid, else a new one) to the current context"""
+    request_id = incoming_id if incoming_id and _VALID_REQUEST_ID.match(incoming_id) else uuid.uuid4().hex
+    request_id_var.set(request_id)
+    _debug_sampled_var.set(random.random() < LOG_DEBUG_SAMPLE_RATE)
+    return request_id
+
+
+def end_request() -> None:
+    """Clear the correlation ID so a reused worker thread doesn't carry it into the next request"""
+    request_id_var.set(None)
+    _debug_sampled_var.set(None)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra= fields are included as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _ContextFilter(logging.Filter):
+    # Runs on the calling thread: tag the record and apply debug sampling before it is queued
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        if record.levelno < logging.INFO:
+            sampled = _debug_sampled_var.get()
+            if sampled is None:
+                sampled = random.random() < LOG_DEBUG_SAMPLE_RATE
+            return sampled
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render any traceback now; leave JSON encoding to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+_stream_handler = None
+_setup_lock = threading.Lock()
+
+
+def _start_listener() -> None:
+    global _listener
+    _listener = logging.handlers.QueueListener(_handler.queue, _stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    # Flush what's queued at interpreter exit
+    if _listener is not None:
+        _listener.stop()
+
+
+def _reset_after_fork() -> None:
+    # The listener thread doesn't survive fork and the queue's lock may be held; start over
+    if _handler is not None:
+        _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+        _start_listener()
+
+
+def configure_logging() -> None:
+    """Route all logging through the background JSON writer (idempotent)"""
+    global _handler, _stream_handler
+    with _setup_lock:
+        if _handler is not None:
+            return
+        _stream_handler = logging.StreamHandler(sys.stdout)
+        _stream_handler.setFormatter(JsonFormatter())
+        _handler = _QueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _handler.addFilter(_ContextFilter())
+
+        root = logging.getLogger()
+        root.handlers[:] = [_handler]
+        root.setLevel(LOG_LEVEL)
+        for override in filter(None, (part.strip() for part in LOG_LEVELS.split(','))):
+            name, _, level = override.partition('=')
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+        _start_listener()
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def logging_stats() -> Dict[str, int]:
+    """Return queued and dropped record counts"""
+    return {
+        'queued': _handler.queue.qsize() if _handler is not None else 0,
+        'dropped': _handler.dropped if _handler is not None else 0,
+    }
@@ -1,25 +1,111 @@
-import sounddevice as sd
 import numpy as np
 import queue    
 import threading
 import os
-import librosa
-from faster_whisper import WhisperModel
+import io
 
 # settings - optimized for command recognition
 samplerate = 16000
 block_duration = 0.25 # secs - smaller blocks for better responsiveness
 chunk_duration = 3 # secs - longer chunks for better context
+overlap_duration = 1 # secs - audio shared by consecutive chunks so words at the edges aren't cut
 channels = 1
 
 frames_per_block = int(samplerate * block_duration)
 frames_per_chunk = int(samplerate * chunk_duration)
+frames_per_overlap = int(samplerate * overlap_duration)
+frames_per_hop = frames_per_chunk - frames_per_overlap
+
+# live listening: "vad" sends whole utterances at end-of-speech, "windows" transcribes overlapping chunks
+listen_mode = os.getenv("STT_LISTEN_MODE", "vad")
+
+# energy VAD settings, applied to each raw block before any Whisper work
+vad_threshold_db = -45 # dBFS - blocks quieter than this are never speech
+vad_noise_margin_db = 10 # dB - speech must also be this far above the tracked noise floor
+speech_pad_duration = 0.25 # secs - audio kept from before speech onset
+end_silence_duration = 0.5 # secs - trailing silence that ends an utterance
+min_speech_duration = 0.25 # secs - bursts this short or shorter (clicks, bumps) are dropped
+max_utterance_duration = 15 # secs - longer speech is sent in pieces of this size
 
 audio_queue = queue.Queue()
-audio_buffer = []
+
+
+class AudioRingBuffer:
+    """Preallocated circular buffer of mono float32 samples, addressed by absolute frame index"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=np.float32)
+        self.total = 0  # frames written since the start
+
+    @property
+    def oldest(self):
+        """Absolute index of the oldest frame still held"""
+        return max(0, self.total - self.capacity)
+
+    def write(self, block):
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        if len(block) > self.capacity:
+            self.total += len(block) - self.capacity
+            block = block[-self.capacity:]
+        pos = self.total % self.capacity
+        first = min(len(block), self.capacity - pos)
+        self.data[pos:pos + first] = block[:first]
+        self.data[:len(block) - first] = block[first:]
+        self.total += len(block)
+
+    def read(self, start, end):
+        """Copy frames [start, end) out as one contiguous array"""
+        if start < self.oldest or end > self.total or start > end:
+            raise ValueError(f"Frames {start}-{end} not in buffer ({self.oldest}-{self.total})")
+        pos = start % self.capacity
+        count = end - start
+        if pos + count <= self.capacity:
+            return self.data[pos:pos + count].copy()
+        return np.concatenate((self.data[pos:], self.data[:count - (self.capacity - pos)]))
 
 # model setup - use CPU for better compatibility
-model = WhisperModel("small", device="cpu", compute_type="int8")
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "small")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))  # 0 = CTranslate2 default
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", "1"))
+
+# Loaded on first use (or by preload()) so importing this module stays cheap
+_model = None
+_model_lock = threading.Lock()
+
+def _reset_after_fork():
+    # A model load in progress in the parent would leave the lock held forever in the child
+    global _model_lock
+    _model_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def load_model():
+    """Build a new WhisperModel from the configured settings"""
+    from faster_whisper import WhisperModel
+    return WhisperModel(
+        WHISPER_MODEL_SIZE,
+        device=WHISPER_DEVICE,
+        compute_type=WHISPER_COMPUTE_TYPE,
+        cpu_threads=WHISPER_CPU_THREADS,
+        num_workers=WHISPER_NUM_WORKERS
+    )
+
+def get_model():
+    """Return the shared WhisperModel, loading it on first call"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model()
+    return _model
+
+def preload():
+    """Load the Whisper model now instead of on the first transcription"""
+    get_model()
 
 def audio_callback(indata, frames, time, status):
     if status:
@@ -27,36 +113,174 @@ def audio_callback(indata, frames, time, status):
     audio_queue.put(indata.copy())
 
 def recorder():
+    import sounddevice as sd
     with sd.InputStream(samplerate=samplerate, channels=channels, callback=audio_callback, blocksize=frames_per_block):
         print("Listning... Press Ctrl+C to stop")
         while True:
             sd.sleep(100)
 
+def transcribe_window(audio_data, window_start, cutoff, committed_until, whisper_model=None):
+    """
+    Transcribe one sliding window and return only the words not emitted before.
+    
+    Times are absolute seconds. Words starting at or after cutoff are left for
+    the next window, which starts at cutoff and sees them whole; words ending
+    at or before committed_until were already emitted by the previous window.
+    
+    Returns:
+        tuple: (new text, updated committed_until)
+    """
+    segments, _ = (whisper_model or get_model()).transcribe(
+        audio_data,
+        language="en", 
+        beam_size=1,
+        word_timestamps=True,
+        vad_filter=True,  # Enable voice activity detection
+        vad_parameters=dict(min_silence_duration_ms=500)
+    )
+    words = []
+    for segment in segments:
+        for word in segment.words or []:
+            start = window_start + word.start
+            end = window_start + word.end
+            if start >= cutoff or end <= committed_until:
+                continue
+            words.append(word.word)
+            committed_until = end
+    return "".join(words).strip(), committed_until
+
+class EnergyVAD:
+    """Flags speech blocks by RMS level relative to an adaptive noise floor"""
+
+    def __init__(self, threshold_db=vad_threshold_db, margin_db=vad_noise_margin_db, noise_adapt=0.05, speech_adapt=0.02):
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.noise_adapt = noise_adapt
+        self.speech_adapt = speech_adapt
+        self.noise_floor_db = threshold_db - margin_db
+
+    def is_speech(self, block):
+        samples = np.asarray(block, dtype=np.float32).reshape(-1)
+        rms = float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+        level_db = 20 * np.log10(max(rms, 1e-10))
+        speech = level_db > self.threshold_db and level_db > self.noise_floor_db + self.margin_db
+        # Track the floor slowly through "speech" too, so steady noise above it is
+        # absorbed within a few seconds instead of being classed as speech forever
+        adapt = self.speech_adapt if speech else self.noise_adapt
+        self.noise_floor_db += adapt * (level_db - self.noise_floor_db)
+        return speech
+
+
+class UtteranceDetector:
+    """
+    Endpointing on top of EnergyVAD: buffers audio from speech onset (plus a
+    little pre-roll) and hands back the whole utterance once the speaker stops.
+    """
+
+    def __init__(self, vad=None):
+        self.vad = vad or EnergyVAD()
+        self.ring = AudioRingBuffer(int(samplerate * (max_utterance_duration + speech_pad_duration)) + frames_per_block)
+        self.start = None  # absolute frame where the current utterance starts
+        self.speech_frames = 0
+        self.silent_frames = 0
+
+    def add_block(self, block):
+        """Feed one raw block; returns a finished utterance's samples or None"""
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        self.ring.write(block)
+        speech = self.vad.is_speech(block)
+
+        if self.start is None:
+            if speech:
+                self.start = max(self.ring.oldest, self.ring.total - len(block) - int(samplerate * speech_pad_duration))
+                self.speech_frames = len(block)
+                self.silent_frames = 0
+            return None
+
+        if speech:
+            self.speech_frames += len(block)
+            self.silent_frames = 0
+        else:
+            self.silent_frames += len(block)
+
+        if self.silent_frames >= samplerate * end_silence_duration:
+            return self._finish()
+        if self.ring.total - self.start >= samplerate * max_utterance_duration:
+            # Long speech: send what we have and keep listening as a continuation
+            utterance = self._finish()
+            self.start = self.ring.total
+            self.speech_frames = 0
+            return utterance
+        return None
+
+    def _finish(self):
+        start, self.start = self.start, None
+        # A lone speech block (a click or bump) is never long enough
+        if self.speech_frames <= samplerate * min_speech_duration:
+            return None
+        return self.ring.read(start, self.ring.total)
+
+
 def transcriber():
-    global audio_buffer
-    while True:
-        block = audio_queue.get()
-        audio_buffer.append(block)
+    """Transcribe live microphone audio in the configured listen_mode"""
+    if listen_mode == "windows":
+        windowed_transcriber()
+    else:
+        vad_transcriber()
 
-        total_frames = sum(len(b) for b in audio_buffer)
-        if total_frames >= frames_per_chunk:
-            audio_data = np.concatenate(audio_buffer)[:frames_per_chunk]
-            audio_buffer = [] # buffer clear
+def vad_transcriber():
+    # Quiet blocks cost one RMS each; Whisper only runs once per finished utterance
+    detector = UtteranceDetector()
+    while True:
+        utterance = detector.add_block(audio_queue.get())
+        if utterance is None:
+            continue
+        text = transcribe_audio(utterance)
+        if text:  # Only print non-empty text
+            print(f"Transcribed: {text}")
+            # You can add additional processing here for command recognition
 
-            audio_data = audio_data.flatten().astype(np.float32)
+def windowed_transcriber():
+    # Room for a couple of windows so a slow transcription doesn't lose audio
+    ring = AudioRingBuffer(frames_per_chunk * 4)
+    window_start = 0
+    committed_until = 0.0
+    while True:
+        ring.write(audio_queue.get())
 
-            segments, _ = model.transcribe(
+        while ring.total - window_start >= frames_per_chunk:
+            if window_start < ring.oldest:
+                print("Transcription fell behind, skipping ahead")
+                window_start = ring.total - frames_per_chunk
+            audio_data = ring.read(window_start, window_start + frames_per_chunk)
+            text, committed_until = transcribe_window(
                 audio_data,
-                language="en", 
-                beam_size=1,
-                vad_filter=True,  # Enable voice activity detection
-                vad_parameters=dict(min_silence_duration_ms=500)
+                window_start / samplerate,
+                (window_start + frames_per_hop) / samplerate,
+                committed_until
             )
-            for segment in segments:
-                text = segment.text.strip()
-                if text:  # Only print non-empty segments
-                    print(f"Transcribed: {text}")
-                    # You can add additional processing here for command recognition
+            window_start += frames_per_hop
+            if text:  # Only print non-empty text
+                print(f"Transcribed: {text}")
+                # You can add additional processing here for command recognition
+
+def transcribe_audio(audio_data, whisper_model=None):
+    """Run Whisper on 16 kHz mono float32 samples and join the segments"""
+    # Transcribe using Whisper with improved settings
+    segments, _ = (whisper_model or get_model()).transcribe(
+        audio_data, 
+        language="en", 
+        beam_size=1,
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=500)
+    )
+    
+    # Combine all segments into a single text
+    full_text = ""
+    for segment in segments:
+        full_text += segment.text + " "
+    
+    return full_text.strip()
 
 def transcribe(audio_file_path):
     """
@@ -73,28 +297,95 @@ def transcribe(audio_file_path):
             raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
         
         # Load audio file using librosa
+        import librosa
         audio_data, sr = librosa.load(audio_file_path, sr=16000, mono=True)
         
-        # Transcribe using Whisper with improved settings
-        segments, _ = model.transcribe(
-            audio_data, 
-            language="en", 
-            beam_size=1,
-            vad_filter=True,
-            vad_parameters=dict(min_silence_duration_ms=500)
-        )
-        
-        # Combine all segments into a single text
-        full_text = ""
-        for segment in segments:
-            full_text += segment.text + " "
-        
-        return full_text.strip()
+        return transcribe_audio(audio_data)
         
     except Exception as e:
         print(f"Error transcribing audio: {e}")
         return ""
 
+def decode_audio_bytes(audio_bytes):
+    """Decode an in-memory audio file to 16 kHz mono float32 samples"""
+    # Decode straight from memory with PyAV, resampled to 16 kHz mono
+    from faster_whisper import decode_audio
+    return decode_audio(io.BytesIO(audio_bytes), sampling_rate=samplerate)
+
+def transcribe_bytes(audio_bytes, whisper_model=None):
+    """
+    Transcribe an in-memory audio file (wav, mp3, webm, ...) using Whisper model.
+    
+    Args:
+        audio_bytes (bytes): Encoded audio, e.g. an uploaded file's contents
+        whisper_model (WhisperModel): Model to use instead of the shared one
+        
+    Returns:
+        str: Transcribed text
+        
+    Raises:
+        Exception: If the audio can't be decoded or transcribed
+    """
+    return transcribe_audio(decode_audio_bytes(audio_bytes), whisper_model)
+
+def _faster_whisper_version():
+    import faster_whisper
+    version = getattr(faster_whisper, "__version__", "0")
+    return tuple(int(part) for part in version.split(".")[:2] if part.isdigit())
+
+def transcribe_batch(audio_list, whisper_model=None, batch_size=8, window_seconds=30):
+    """
+    Transcribe several short clips together with faster-whisper's batched pipeline.
+    
+    Each clip is placed at the start of its own silent window_seconds slot and
+    the clip_timestamps cover whole slots, so the pipeline can't merge clips
+    into one chunk: every clip is decoded as a separate window of the batch.
+    
+    Args:
+        audio_list (list): 16 kHz mono float32 arrays, each at most window_seconds long
+        whisper_model (WhisperModel): Model to use instead of the shared one
+        batch_size (int): Windows decoded per forward pass
+        window_seconds (int): Whisper's window length (the pipeline's chunk_length)
+        
+    Returns:
+        list: Transcribed text for each clip, in order
+    """
+    try:
+        from faster_whisper import BatchedInferencePipeline
+        # Earlier releases read clip_timestamps as sample offsets, not seconds
+        usable = _faster_whisper_version() >= (1, 2)
+    except ImportError:
+        usable = False
+    if not usable:
+        return [transcribe_audio(audio_data, whisper_model) for audio_data in audio_list]
+    
+    window = int(samplerate * window_seconds)
+    audio = np.zeros(window * len(audio_list), dtype=np.float32)
+    clips = []
+    for i, audio_data in enumerate(audio_list):
+        audio_data = np.asarray(audio_data, dtype=np.float32)[:window]
+        audio[i * window:i * window + len(audio_data)] = audio_data
+        # Full-slot clips each fill a whole chunk, so no two share one
+        clips.append({"start": i * window_seconds, "end": (i + 1) * window_seconds})
+    
+    pipeline = BatchedInferencePipeline(model=whisper_model or get_model())
+    segments, _ = pipeline.transcribe(
+        audio,
+        language="en",
+        beam_size=1,
+        vad_filter=False,  # Required for clip_timestamps to be used as-is
+        clip_timestamps=clips,
+        chunk_length=window_seconds,
+        batch_size=batch_size
+    )
+    
+    # Segment times are offset by their window's position, which names the clip
+    texts = [[] for _ in audio_list]
+    for segment in segments:
+        i = min(max(int(segment.start // window_seconds), 0), len(audio_list) - 1)
+        texts[i].append(segment.text.strip())
+    return [" ".join(t for t in parts if t) for parts in texts]
+
 def start_realtime_transcription():
     """Start real-time transcription (for standalone use)"""
     threading.Thread(target=recorder, daemon=True).start()
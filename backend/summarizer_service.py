@@ -1,18 +1,345 @@
+import asyncio
 import os
+import threading
+import time
+from typing import List, Optional
 from dotenv import load_dotenv
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import logging
+from response_cache import ResponseCache, make_cache_key
+from single_flight import SingleFlight
+from metrics import stage_metrics, stage_timer
+from translation_memory import TranslationMemory, split_sentences
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip('/')
+SUMMARY_MODEL = "gemini-2.0-flash"
 
+# Connection pool settings for the shared Gemini session
+GEMINI_POOL_CONNECTIONS = int(os.getenv("GEMINI_POOL_CONNECTIONS", "4"))
+GEMINI_POOL_MAXSIZE = int(os.getenv("GEMINI_POOL_MAXSIZE", "16"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "2"))
+GEMINI_RETRY_BACKOFF = float(os.getenv("GEMINI_RETRY_BACKOFF", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
-def summarize(text_input: str, translate_to_hindi: bool = False) -> str:
-    if not GEMINI_API_KEY:
-        raise RuntimeError("GEMINI_API_KEY not configured in environment/.env")
+# Upper bound on concurrent Gemini connections from the async client (ASGI app)
+GEMINI_ASYNC_MAX_CONNECTIONS = int(os.getenv("GEMINI_ASYNC_MAX_CONNECTIONS", "1000"))
 
-    prompt = f"""
+# Summary cache settings (SUMMARY_CACHE_DB enables the on-disk tier)
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "512"))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "3600"))
+SUMMARY_CACHE_DB = os.getenv("SUMMARY_CACHE_DB") or None
+SUMMARY_CACHE_DB_ENTRIES = int(os.getenv("SUMMARY_CACHE_DB_ENTRIES", "10000"))
+
+# Request fields that change on every call without changing the answer
+VOLATILE_CONTEXT_KEYS = ('timestamp',)
+
+summary_cache = ResponseCache(max_entries=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL, db_path=SUMMARY_CACHE_DB,
+                              max_disk_entries=SUMMARY_CACHE_DB_ENTRIES)
+
+# English -> Hindi pairs reused across requests (empty path keeps it in memory only). The default
+# lives next to this file so it doesn't depend on the directory the server was started from
+TRANSLATION_MEMORY_PATH = os.getenv(
+    "TRANSLATION_MEMORY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "translation_memory.jsonl")
+) or None
+TRANSLATION_MEMORY_SIZE = int(os.getenv("TRANSLATION_MEMORY_SIZE", "50000"))
+translation_memory = TranslationMemory(TRANSLATION_MEMORY_PATH, max_entries=TRANSLATION_MEMORY_SIZE)
+
+# Coalesce concurrent identical summarize / translate calls into one upstream request
+summary_flight = SingleFlight()
+translation_flight = SingleFlight()
+
+# Answer Hindi requests with one call returning both languages as JSON
+GEMINI_FUSED_HINDI = os.getenv("GEMINI_FUSED_HINDI", "1").lower() not in ("0", "false", "no")
+
+FALLBACK_RESPONSE = "🤖 Sorry, I couldn't get a response."
+
+FUSED_HINDI_INSTRUCTIONS = """
+OUTPUT:
+Return only a JSON object with two string fields and nothing else:
+{"english": "<your response in English>", "hindi": "<the same response in natural, conversational Hindi>"}
+"""
+
+HINDI_DIRECT_INSTRUCTIONS = """
+LANGUAGE:
+Write your entire response in natural, conversational Hindi (Devanagari script) only.
+"""
+
+# Which path served each summarize() call: cache, english, fused, two_step or stream
+summary_path_counts = {'cache': 0, 'english': 0, 'fused': 0, 'two_step': 0, 'stream': 0}
+_summary_paths_lock = threading.Lock()
+
+_session = None
+_session_lock = threading.Lock()
+_async_client = None
+
+
+def _reset_after_fork() -> None:
+    # Pooled sockets can't be shared with the parent, and a lock held at fork time would never
+    # be released; each worker starts with its own
+    global _session, _session_lock, _async_client, _summary_paths_lock
+    _session = None
+    _session_lock = threading.Lock()
+    _async_client = None
+    _summary_paths_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive session used for all Gemini calls"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=GEMINI_MAX_RETRIES,
+                    backoff_factor=GEMINI_RETRY_BACKOFF,
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=None,  # generateContent is a POST, retry it too
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=GEMINI_POOL_CONNECTIONS,
+                    pool_maxsize=GEMINI_POOL_MAXSIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def get_pool_stats() -> dict:
+    """Connection reuse statistics for the shared Gemini session"""
+    stats = {'requests': 0, 'new_connections': 0, 'reused_connections': 0, 'pools': 0}
+    if _session is None:
+        return stats
+    seen = set()
+    for adapter in _session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats['pools'] += 1
+            stats['requests'] += pool.num_requests
+            stats['new_connections'] += pool.num_connections
+    stats['reused_connections'] = max(stats['requests'] - stats['new_connections'], 0)
+    return stats
+
+
+def _canonicalize_request(text_input: str) -> tuple:
+    """Split summarizer input into canonical (page context, user input) strings"""
+    try:
+        data = json.loads(text_input)
+    except (TypeError, ValueError):
+        return '', text_input.strip()
+    if not isinstance(data, dict):
+        return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False), ''
+    data = {k: v for k, v in data.items() if k not in VOLATILE_CONTEXT_KEYS}
+    user_input = data.pop('userInput', '')
+    user_input = user_input.strip() if isinstance(user_input, str) else json.dumps(user_input, sort_keys=True)
+    page_context = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return page_context, user_input
+
+
+def _gemini_request(prompt: str, model_name: str, method: str) -> tuple:
+    """URL, headers and JSON payload for a single-prompt Gemini call"""
+    url = f"{GEMINI_API_BASE}/v1beta/models/{model_name}:{method}"
+    headers = {
+        'Content-Type': 'application/json',
+        'x-goog-api-key': GEMINI_API_KEY
+    }
+    payload = {
+        'contents': [
+            {
+                'parts': [{'text': prompt}]
+            }
+        ]
+    }
+    return url, headers, payload
+
+
+def _reply_text(data: dict) -> str:
+    candidate = data.get('candidates', [{}])[0]
+    content = candidate.get('content', {}).get('parts', [{}])[0]
+    return content.get('text', "")
+
+
+def _sse_text_pieces(line: str) -> List[str]:
+    """Text pieces carried by one line of a streamGenerateContent SSE response"""
+    if not line or not line.startswith('data:'):
+        return []
+    try:
+        data = json.loads(line[5:].strip())
+    except ValueError:
+        return []
+    candidate = data.get('candidates', [{}])[0]
+    return [part.get('text') for part in candidate.get('content', {}).get('parts', []) if part.get('text')]
+
+
+def _generate_content(prompt: str, model_name: str, timeout: float) -> str:
+    """Send a single prompt to Gemini generateContent and return the reply text"""
+    url, headers, payload = _gemini_request(prompt, model_name, 'generateContent')
+    response = get_session().post(url, headers=headers, json=payload, timeout=timeout)
+    response.raise_for_status()
+    return _reply_text(response.json())
+
+
+def _stream_generate_content(prompt: str, model_name: str, timeout: float):
+    """Stream a prompt through Gemini streamGenerateContent, yielding text pieces as they arrive"""
+    url, headers, payload = _gemini_request(prompt, model_name, 'streamGenerateContent')
+    started = time.perf_counter()
+    first = True
+    with get_session().post(url, headers=headers, json=payload, params={'alt': 'sse'},
+                            timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        # SSE is UTF-8, but without a charset requests would decode text/* as ISO-8859-1
+        response.encoding = 'utf-8'
+        for line in response.iter_lines(decode_unicode=True):
+            for piece in _sse_text_pieces(line):
+                if first:
+                    stage_metrics.observe('gemini_first_token', time.perf_counter() - started)
+                    first = False
+                yield piece
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Return the shared async client used for Gemini calls in the ASGI app"""
+    global _async_client
+    if _async_client is None:
+        # With h2 installed, HTTP/2 multiplexes concurrent calls over a few TLS
+        # connections; otherwise each in-flight call holds an HTTP/1.1 connection
+        limits = httpx.Limits(max_connections=GEMINI_ASYNC_MAX_CONNECTIONS,
+                              max_keepalive_connections=GEMINI_POOL_MAXSIZE)
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        _async_client = httpx.AsyncClient(limits=limits, http2=http2)
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        client, _async_client = _async_client, None
+        await client.aclose()
+
+
+async def _send_with_retries(send):
+    """Call send() until it returns a non-retryable response, backing off like the sync session"""
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        last_attempt = attempt == GEMINI_MAX_RETRIES
+        try:
+            response = await send()
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                return response
+            await response.aclose()
+        await asyncio.sleep(GEMINI_RETRY_BACKOFF * (2 ** attempt))
+
+
+async def _generate_content_async(prompt: str, model_name: str, timeout: float) -> str:
+    """Async _generate_content() on the shared httpx client"""
+    url, headers, payload = _gemini_request(prompt, model_name, 'generateContent')
+    client = get_async_client()
+    response = await _send_with_retries(
+        lambda: client.post(url, headers=headers, json=payload, timeout=timeout))
+    response.raise_for_status()
+    return _reply_text(response.json())
+
+
+async def _stream_generate_content_async(prompt: str, model_name: str, timeout: float):
+    """Async _stream_generate_content(): yields text pieces as they arrive"""
+    url, headers, payload = _gemini_request(prompt, model_name, 'streamGenerateContent')
+    started = time.perf_counter()
+    first = True
+    client = get_async_client()
+    request = client.build_request('POST', url, headers=headers, json=payload,
+                                   params={'alt': 'sse'}, timeout=timeout)
+    response = await _send_with_retries(lambda: client.send(request, stream=True))
+    try:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            for piece in _sse_text_pieces(line):
+                if first:
+                    stage_metrics.observe('gemini_first_token', time.perf_counter() - started)
+                    first = False
+                yield piece
+    finally:
+        await response.aclose()
+
+
+def _run_steps(steps):
+    """Drive a step generator with blocking Gemini calls and return its result.
+
+    The summarize/translate logic is written once as generators that yield
+    (prompt, model_name, timeout) for each Gemini call and receive the reply,
+    so the sync and async entry points share it.
+    """
+    try:
+        call = next(steps)
+        while True:
+            try:
+                with stage_timer('gemini'):
+                    reply = _generate_content(*call)
+            except Exception as e:
+                call = steps.throw(e)
+            else:
+                call = steps.send(reply)
+    except StopIteration as stop:
+        return stop.value
+
+
+def _resume(advance, *args) -> tuple:
+    """Advance a step generator: (next Gemini call, None), or (None, result) once it returns"""
+    # StopIteration can't be passed through a Future, so turn it into a value here
+    try:
+        return advance(*args), None
+    except StopIteration as stop:
+        return None, stop.value
+
+
+async def _run_steps_async(steps):
+    """Async _run_steps(): awaits each Gemini call instead of blocking.
+
+    The steps themselves read and write the summary cache and translation memory
+    (SQLite and file I/O), so they are advanced in a worker thread, off the event loop.
+    """
+    call, result = await asyncio.to_thread(_resume, next, steps)
+    while call is not None:
+        try:
+            with stage_timer('gemini'):
+                reply = await _generate_content_async(*call)
+        except Exception as e:
+            call, result = await asyncio.to_thread(_resume, steps.throw, e)
+        else:
+            call, result = await asyncio.to_thread(_resume, steps.send, reply)
+    return result
+
+
+def _build_summary_prompt(text_input: str) -> str:
+    return f"""
 You are a helpful voice assistant for a mobile app. The user has provided both their voice input and the current page context.
 
 PAGE CONTEXT (JSON data about the current app page):
@@ -35,42 +362,213 @@ Remember: You have access to the complete page structure, so use it to provide a
 """
 
 
+def _parse_json_reply(reply: str):
+    """Parse a JSON model reply, tolerating a markdown code fence; None if invalid"""
+    reply = reply.strip().strip('`').strip()
+    if reply.startswith('json'):
+        reply = reply[4:].strip()
+    try:
+        return json.loads(reply)
+    except ValueError:
+        return None
 
-    model_name = "gemini-2.0-flash"
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent"
-    headers = {
-        'Content-Type': 'application/json',
-        'x-goog-api-key': GEMINI_API_KEY
-    }
-    payload = {
-        'contents': [
-            {
-                'parts': [{'text': prompt}]
-            }
-        ]
-    }
-    response = requests.post(url, headers=headers, json=payload, timeout=25)
-    response.raise_for_status()
 
-    data = response.json()
-    candidate = data.get('candidates', [{}])[0]
-    content = candidate.get('content', {}).get('parts', [{}])[0]
-    ai_response = content.get('text', "")
+def _record_path(path: str) -> None:
+    with _summary_paths_lock:
+        summary_path_counts[path] = summary_path_counts.get(path, 0) + 1
+
+
+def get_summary_path_stats() -> dict:
+    """How many summarize() calls each serving path handled"""
+    with _summary_paths_lock:
+        return dict(summary_path_counts)
+
+
+def _summary_cache_key(text_input: str, translate_to_hindi: bool) -> str:
+    page_context, user_input = _canonicalize_request(text_input)
+    return make_cache_key('summary', page_context, user_input, SUMMARY_MODEL, bool(translate_to_hindi))
+
+
+def _summary_cache_lookup(cache_key: str) -> Optional[str]:
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        _record_path('cache')
+    return cached
+
+
+def _summarize_steps(text_input: str, translate_to_hindi: bool, cache_key: str):
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not configured in environment/.env")
 
-    summary = ai_response.strip() or "🤖 Sorry, I couldn't get a response."
+    cached = _summary_cache_lookup(cache_key)
+    if cached is not None:
+        return cached
+
+    prompt = _build_summary_prompt(text_input)
+    english_summary = None
+
+    if translate_to_hindi and GEMINI_FUSED_HINDI:
+        # Ask for both languages in one round trip
+        reply = yield (prompt + FUSED_HINDI_INSTRUCTIONS, SUMMARY_MODEL, 25)
+        parsed = _parse_json_reply(reply)
+        if isinstance(parsed, dict):
+            hindi = parsed.get('hindi')
+            english = parsed.get('english')
+            if isinstance(english, str) and english.strip():
+                english_summary = english.strip()
+            if isinstance(hindi, str) and hindi.strip():
+                hindi = hindi.strip()
+                if english_summary:
+                    translation_memory.add_sentences(english_summary, hindi)
+                summary_cache.set(cache_key, hindi)
+                _record_path('fused')
+                return hindi
+
+    if english_summary is None:
+        ai_response = yield (prompt, SUMMARY_MODEL, 25)
+        english_summary = ai_response.strip() or FALLBACK_RESPONSE
+    summary = english_summary
     
     # Translate to Hindi if requested
-    if translate_to_hindi and summary != "🤖 Sorry, I couldn't get a response.":
-        summary = translate_to_hindi_text(summary)
+    cacheable = summary != FALLBACK_RESPONSE
+    if translate_to_hindi and cacheable:
+        with stage_timer('translation'):
+            summary = yield from _translate_steps(summary)
+        # The translation falls back to the English text on failure
+        cacheable = summary != english_summary
     
+    _record_path('two_step' if translate_to_hindi else 'english')
+    if cacheable:
+        summary_cache.set(cache_key, summary)
     return summary
 
 
-def translate_to_hindi_text(text: str) -> str:
-    """Translate English text to Hindi using Gemini"""
+def summarize(text_input: str, translate_to_hindi: bool = False) -> str:
+    # Identical questions asked at the same time share one Gemini round trip
+    cache_key = _summary_cache_key(text_input, translate_to_hindi)
+    return summary_flight.do(
+        cache_key, lambda: _run_steps(_summarize_steps(text_input, translate_to_hindi, cache_key)))
+
+
+async def summarize_async(text_input: str, translate_to_hindi: bool = False) -> str:
+    """summarize() for the event loop: Gemini calls are awaited, not blocking"""
+    cache_key = _summary_cache_key(text_input, translate_to_hindi)
+    return await summary_flight.do_async(
+        cache_key, lambda: _run_steps_async(_summarize_steps(text_input, translate_to_hindi, cache_key)))
+
+
+def _stream_prompt(text_input: str, translate_to_hindi: bool) -> str:
+    prompt = _build_summary_prompt(text_input)
+    if translate_to_hindi:
+        # A translation step can't start until the answer is complete, so ask for Hindi directly
+        prompt += HINDI_DIRECT_INSTRUCTIONS
+    return prompt
+
+
+def _finish_stream(cache_key: str, pieces: List[str]) -> Optional[str]:
+    """Cache a completed streamed answer; returns the fallback text if it was empty"""
+    _record_path('stream')
+    summary = ''.join(pieces).strip()
+    if summary:
+        summary_cache.set(cache_key, summary)
+        return None
+    return FALLBACK_RESPONSE
+
+
+def summarize_stream(text_input: str, translate_to_hindi: bool = False):
+    """Like summarize(), but yields the answer in pieces as Gemini produces them"""
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not configured in environment/.env")
+
+    cache_key = _summary_cache_key(text_input, translate_to_hindi)
+    cached = _summary_cache_lookup(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    for piece in _stream_generate_content(_stream_prompt(text_input, translate_to_hindi), SUMMARY_MODEL, timeout=25):
+        pieces.append(piece)
+        yield piece
+
+    fallback = _finish_stream(cache_key, pieces)
+    if fallback:
+        yield fallback
+
+
+async def summarize_stream_async(text_input: str, translate_to_hindi: bool = False):
+    """Async summarize_stream()"""
+    if not GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY not configured in environment/.env")
+
+    cache_key = _summary_cache_key(text_input, translate_to_hindi)
+    cached = await asyncio.to_thread(_summary_cache_lookup, cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    prompt = _stream_prompt(text_input, translate_to_hindi)
+    async for piece in _stream_generate_content_async(prompt, SUMMARY_MODEL, timeout=25):
+        pieces.append(piece)
+        yield piece
+
+    fallback = await asyncio.to_thread(_finish_stream, cache_key, pieces)
+    if fallback:
+        yield fallback
+
+
+def _translate_steps(text: str):
     if not GEMINI_API_KEY:
         return text  # Return original if no API key
     
+    # Reuse remembered sentences and only send the misses to the model
+    sentences = split_sentences(text)
+    translated = translation_memory.get_many(sentences)
+    missing = list(dict.fromkeys(s for s in sentences if translated[s] is None))
+    translation_memory.record_request(hit=not missing)
+    
+    try:
+        if len(missing) == 1:
+            translated[missing[0]] = yield from _translate_one(missing[0])
+        elif missing:
+            batch = yield from _translate_batch(missing)
+            if batch is None:
+                # Batch reply unusable, translate the whole text as before
+                hindi_text = yield from _translate_one(text)
+                if hindi_text is None:
+                    return text  # Return original if translation fails
+                translation_memory.add_sentences(text, hindi_text)
+                return hindi_text
+            translated.update(batch)
+    except Exception as e:
+        logger.warning("Translation failed, returning the original text", extra={'error': str(e)})
+        return text  # Return original text if translation fails
+    
+    if not sentences or any(translated[s] is None for s in sentences):
+        return text  # Return original if translation fails
+    
+    hindi_text = ' '.join(translated[s] for s in sentences)
+    # Only sentence pairs are stored; whole answers would rarely recur and grow the file
+    translation_memory.add_many({s: translated[s] for s in missing})
+    return hindi_text
+
+
+def translate_to_hindi_text(text: str) -> str:
+    """Translate English text to Hindi using Gemini"""
+    with stage_timer('translation'):
+        return translation_flight.do(make_cache_key('translation', text), lambda: _run_steps(_translate_steps(text)))
+
+
+async def translate_to_hindi_text_async(text: str) -> str:
+    """Async translate_to_hindi_text()"""
+    with stage_timer('translation'):
+        return await translation_flight.do_async(
+            make_cache_key('translation', text), lambda: _run_steps_async(_translate_steps(text)))
+
+
+def _translate_one(text: str):
+    """Step: translate a single English string, returning None on an empty reply"""
     prompt = f"""
 Translate the following English text to Hindi. Keep it natural and conversational for a voice assistant.
 Only return the Hindi translation, no additional text or explanations.
@@ -79,33 +577,24 @@ Text to translate:
 {text}
 """
     
-    model_name = "gemini-2.0-flash"
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent"
-    headers = {
-        'Content-Type': 'application/json',
-        'x-goog-api-key': GEMINI_API_KEY
-    }
-    payload = {
-        'contents': [
-            {
-                'parts': [{'text': prompt}]
-            }
-        ]
-    }
+    hindi_text = (yield (prompt, SUMMARY_MODEL, 15)).strip()
+    return hindi_text or None
+
+
+def _translate_batch(sentences: List[str]):
+    """Step: translate several English sentences in one request, None if the reply is unusable"""
+    prompt = f"""
+Translate each English sentence in the following JSON array to Hindi. Keep them natural and conversational for a voice assistant.
+Return only a JSON array of the Hindi translations, in the same order, with exactly {len(sentences)} strings.
+
+Sentences to translate:
+{json.dumps(sentences, ensure_ascii=False)}
+"""
     
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
-        response.raise_for_status()
-        
-        data = response.json()
-        candidate = data.get('candidates', [{}])[0]
-        content = candidate.get('content', {}).get('parts', [{}])[0]
-        hindi_text = content.get('text', "").strip()
-        
-        return hindi_text or text  # Return original if translation fails
-    except Exception as e:
-        print(f"Translation error: {e}")
-        return text  # Return original text if translation fails
+    hindi = _parse_json_reply((yield (prompt, SUMMARY_MODEL, 15)))
+    if not isinstance(hindi, list) or len(hindi) != len(sentences) or not all(isinstance(h, str) and h.strip() for h in hindi):
+        return None
+    return {s: h.strip() for s, h in zip(sentences, hindi)}
 
 
 # if __name__ == "__main__":
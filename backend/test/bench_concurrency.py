@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark many concurrent /api/summarize requests against a running server
+
+Start test/fake_upstream.py with some latency, then the server to compare, e.g.:
+    python main.py                                  # WSGI dev server, thread per request
+    hypercorn asgi_app:app --bind 127.0.0.1:5000    # async serving mode
+and run: python test/bench_concurrency.py --concurrency 200
+"""
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def one_request(url, hindi, timeout):
+    # A unique question per request so the summary cache can't answer it
+    text = json.dumps({
+        'userInput': f'What can I do on this page? ({uuid.uuid4().hex[:8]})',
+        'pageContext': {'appName': 'Flutter App', 'page': 'Home'},
+    })
+    start = time.perf_counter()
+    try:
+        resp = requests.post(f"{url}/api/summarize", json={'text': text, 'translate_to_hindi': hindi}, timeout=timeout)
+        ok = resp.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent summarize requests")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--hindi", action="store_true", help="Request Hindi answers")
+    args = parser.parse_args()
+
+    # One client thread per request so they all hit the server at once
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(one_request, args.url, args.hindi, args.timeout) for _ in range(args.concurrency)]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    failed = sum(1 for ok, _ in results if not ok)
+    print(f"{args.concurrency} concurrent requests in {elapsed:.2f} s "
+          f"({len(latencies) / elapsed:.1f} req/s), {failed} failed")
+    if latencies:
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+        print(f"latency p50 {p50 * 1000:.0f} ms   p95 {p95 * 1000:.0f} ms   max {latencies[-1] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark time to first audio byte: summarize + tts versus the pipelined /api/speak/stream
+
+Start test/fake_upstream.py and main.py pointed at it first (see fake_upstream.py), with
+the TTS cache off (TTS_CACHE_MEMORY_BYTES=0 TTS_CACHE_DIR=): the fake upstream gives every
+question the same answer, so cached sentence audio would otherwise be measured after run 1.
+"""
+import argparse
+import json
+import time
+import uuid
+
+import requests
+
+
+def page_request():
+    # A unique question per run so the summary and audio caches can't answer it
+    return json.dumps({
+        'userInput': f'What can I do on this page? ({uuid.uuid4().hex[:8]})',
+        'pageContext': {'appName': 'Flutter App', 'page': 'Home'},
+    })
+
+
+def tts_cache_hits(base_url):
+    stats = requests.get(f"{base_url}/api/stats").json()['tts_cache']
+    return stats['memory_hits'] + stats['disk_hits']
+
+
+def two_step(base_url):
+    start = time.perf_counter()
+    resp = requests.post(f"{base_url}/api/summarize", json={'text': page_request(), 'translate_to_hindi': False})
+    resp.raise_for_status()
+    summary = resp.json()['summary']
+    first = None
+    total = 0
+    with requests.post(f"{base_url}/api/tts", json={'text': summary}, stream=True) as tts:
+        tts.raise_for_status()
+        for chunk in tts.iter_content(chunk_size=4096):
+            if first is None:
+                first = time.perf_counter() - start
+            total += len(chunk)
+    return first, time.perf_counter() - start, total
+
+
+def pipelined(base_url):
+    start = time.perf_counter()
+    first = None
+    total = 0
+    with requests.post(f"{base_url}/api/speak/stream", json={'text': page_request()}, stream=True) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_content(chunk_size=4096):
+            if first is None:
+                first = time.perf_counter() - start
+            total += len(chunk)
+    return first, time.perf_counter() - start, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipelined TTS")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    hits_before = tts_cache_hits(args.url)
+    for name, fn in (("summarize + tts", two_step), ("speak/stream", pipelined)):
+        results = [fn(args.url) for _ in range(args.runs)]
+        first = sorted(r[0] for r in results)[len(results) // 2]
+        total = sorted(r[1] for r in results)[len(results) // 2]
+        print(f"{name:16s} first audio byte {first * 1000:7.1f} ms   complete {total * 1000:7.1f} ms   "
+              f"({results[0][2]} bytes)")
+    if tts_cache_hits(args.url) != hits_before:
+        print("warning: the TTS cache answered some requests; restart the server with it off")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Latency/throughput trade-off of micro-batched local transcription
+
+Sends the same short clip from many concurrent callers through TranscriptionService
+for each batch size / wait window and prints throughput against p50/p95 latency.
+Run from backend/:  python test/bench_stt_batching.py test/hindi_test.mp3
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcription_service import TranscriptionService  # noqa: E402
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(audio_bytes, batch_size, wait_ms, requests_total, concurrency):
+    service = TranscriptionService(workers=1, queue_size=requests_total, batch_size=batch_size,
+                                   batch_wait_ms=wait_ms, preload=True)
+    service.transcribe(audio_bytes, timeout=None)  # Warm up the worker's model
+
+    latencies = []
+    lock = threading.Lock()
+    remaining = [requests_total]
+
+    def caller():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            service.transcribe(audio_bytes, timeout=None)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=caller) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return requests_total / elapsed, percentile(latencies, 50), percentile(latencies, 95), service.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched local STT")
+    parser.add_argument("audio", help="Short audio clip (under 30 s)")
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--waits-ms", default="10,50")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(args.audio, 'rb') as f:
+        audio_bytes = f.read()
+
+    print(f"{'batch':>5} {'wait ms':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'avg batch':>9}")
+    for batch_size in (int(b) for b in args.batch_sizes.split(',')):
+        waits = [0.0] if batch_size == 1 else [float(w) for w in args.waits_ms.split(',')]
+        for wait_ms in waits:
+            throughput, p50, p95, stats = run(audio_bytes, batch_size, wait_ms, args.requests, args.concurrency)
+            print(f"{batch_size:>5} {wait_ms:>8.0f} {throughput:>7.2f} {p50 * 1000:>8.0f} {p95 * 1000:>8.0f} "
+                  f"{stats['avg_batch_size']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
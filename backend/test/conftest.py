@@ -0,0 +1,52 @@
+"""
+pytest setup for the backend unit tests: python -m pytest test (from backend/)
+The other scripts in this directory are manual checks against a running server or
+microphone and are skipped.
+"""
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the module-level caches in memory and the Gemini and OpenAI clients configured
+os.environ.setdefault('GEMINI_API_KEY', 'test')
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ['TRANSLATION_MEMORY_PATH'] = ''
+os.environ['SUMMARY_CACHE_DB'] = ''
+os.environ['TTS_CACHE_DIR'] = ''
+
+collect_ignore = [
+    'test_hindi_tts.py',
+    'test_voice_recognition.py',
+    'verify_setup.py',
+    'hindi_demo.py',
+]
+
+
+def sse_body(pieces):
+    """A streamGenerateContent SSE body carrying the given text pieces"""
+    events = [{'candidates': [{'content': {'parts': [{'text': piece}]}}]} for piece in pieces]
+    return ''.join(f"data: {json.dumps(event, ensure_ascii=False)}\r\n\r\n" for event in events).encode('utf-8')
+
+
+@pytest.fixture
+def gemini_sse(monkeypatch):
+    """Serve the given text pieces as Gemini's SSE stream, with the headers Gemini sends (no charset)"""
+    import requests
+    import summarizer_service
+    from requests.adapters import HTTPAdapter
+    from urllib3 import HTTPResponse
+
+    def serve(pieces):
+        class Session:
+            def post(self, url, **kwargs):
+                raw = HTTPResponse(body=io.BytesIO(sse_body(pieces)), status=200, preload_content=False,
+                                   headers={'Content-Type': 'text/event-stream'})
+                return HTTPAdapter().build_response(requests.Request('POST', url).prepare(), raw)
+
+        monkeypatch.setattr(summarizer_service, 'get_session', Session)
+    return serve
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini and OpenAI audio APIs, for offline testing and benchmarks
+
+Run it, then point the backend at it:
+    python test/fake_upstream.py --port 8089 --latency 0.3
+    GEMINI_API_BASE=http://127.0.0.1:8089 GEMINI_API_KEY=fake \
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=fake python main.py
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ("On this page you can open Settings from the menu. "
+                 "You can also tap the mic to ask me anything.")
+DEFAULT_HINDI = ("इस पेज पर आप मेनू से सेटिंग्स खोल सकते हैं। "
+                 "आप कुछ भी पूछने के लिए माइक पर टैप कर सकते हैं।")
+
+
+def make_handler(args):
+    class FakeUpstreamHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            if not self.headers.get('Content-Type', '').startswith('application/json'):
+                return {}
+            try:
+                return json.loads(body or b'{}')
+            except ValueError:
+                return {}
+
+        def _prompt(self, payload):
+            try:
+                return payload['contents'][0]['parts'][0]['text']
+            except (KeyError, IndexError, TypeError):
+                return ''
+
+        def _reply_for(self, prompt):
+            if '"english"' in prompt and '"hindi"' in prompt:
+                return json.dumps({'english': args.reply, 'hindi': DEFAULT_HINDI}, ensure_ascii=False)
+            if 'in natural, conversational Hindi' in prompt:
+                return DEFAULT_HINDI
+            if prompt.lstrip().startswith('Translate'):
+                return DEFAULT_HINDI
+            return args.reply
+
+        def _send_json(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            payload = self._read_json()
+            path = self.path.split('?', 1)[0]
+            reply = self._reply_for(self._prompt(payload))
+
+            if path == '/v1/audio/speech':
+                # Fake MP3: an ID3 header plus filler bytes proportional to the text,
+                # streamed in chunks spread over the synthesis time like the real API
+                text = payload.get('input', '')
+                body = b'ID3' + b'\xff\xfb' * (args.tts_bytes_per_char * max(len(text), 1))
+                chunks = [body[i:i + 4096] for i in range(0, len(body), 4096)]
+                time.sleep(args.tts_latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'audio/mpeg')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for chunk in chunks:
+                    self._write_chunk(chunk)
+                    time.sleep(args.tts_per_char * len(text) / len(chunks))
+                self._write_chunk(b'')
+            elif path == '/v1/audio/transcriptions':
+                time.sleep(args.latency)
+                self._send_json(200, {'text': args.transcript})
+            elif path.endswith(':generateContent'):
+                time.sleep(args.latency)
+                self._send_json(200, {'candidates': [{'content': {'parts': [{'text': reply}]}}]})
+            elif path.endswith(':streamGenerateContent'):
+                time.sleep(args.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                words = reply.split(' ')
+                for i in range(0, len(words), args.words_per_chunk):
+                    text = ' '.join(words[i:i + args.words_per_chunk])
+                    if i + args.words_per_chunk < len(words):
+                        text += ' '
+                    event = {'candidates': [{'content': {'parts': [{'text': text}]}}]}
+                    self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\r\n\r\n".encode('utf-8'))
+                    time.sleep(args.chunk_delay)
+                self._write_chunk(b'')
+            else:
+                self._send_json(404, {'error': f'unknown path {path}'})
+
+        def _write_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+    return FakeUpstreamHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini/OpenAI upstream for offline testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the first byte of each reply")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="Seconds between streamed chunks")
+    parser.add_argument("--words-per-chunk", type=int, default=3)
+    parser.add_argument("--reply", default=DEFAULT_REPLY, help="English reply text")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="Seconds of fixed TTS synthesis time")
+    parser.add_argument("--tts-per-char", type=float, default=0.005, help="Extra TTS seconds per input character")
+    parser.add_argument("--tts-bytes-per-char", type=int, default=200, help="Fake MP3 bytes per input character")
+    parser.add_argument("--transcript", default="what can I do on this page", help="Text returned for transcriptions")
+    parser.add_argument("--backlog", type=int, default=1024, help="Listen backlog for concurrency benchmarks")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    # Accept bursts of hundreds of concurrent connections (the default backlog is 5)
+    ThreadingHTTPServer.request_queue_size = args.backlog
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    print(f"Fake upstream listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
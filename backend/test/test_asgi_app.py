@@ -0,0 +1,103 @@
+"""Cached and streamed speech from the ASGI app release their file or upstream even if never sent"""
+import asyncio
+
+import pytest
+
+from audio_cache import AudioCache, audio_cache_key
+
+pytest.importorskip('quart')
+pytest.importorskip('playsound')
+import asgi_app  # noqa: E402
+from quart.wrappers.response import DataBody  # noqa: E402
+
+AUDIO = b'ID3' + bytes(range(256)) * 200
+
+
+class FakeSpeech:
+    async def iter_bytes(self, chunk_size):
+        yield AUDIO
+
+
+class FakeUpstream:
+    closed = False
+
+    async def __aenter__(self):
+        return FakeSpeech()
+
+    async def __aexit__(self, *exc):
+        FakeUpstream.closed = True
+
+
+class FakeAsyncOpenAI:
+    def __init__(self):
+        self.audio = self.speech = self.with_streaming_response = self
+
+    def create(self, **kwargs):
+        return FakeUpstream()
+
+
+@pytest.fixture
+def disk_cache(monkeypatch, tmp_path):
+    cache = AudioCache(max_memory_bytes=0, cache_dir=str(tmp_path))
+    monkeypatch.setattr(asgi_app, 'audio_cache', cache)
+    monkeypatch.setattr(asgi_app, 'openai_client', FakeAsyncOpenAI())
+    FakeUpstream.closed = False
+    return cache
+
+
+def _respond_without_sending(make_response):
+    # Build the response in its own task, as Quart does per request, and drop it unsent
+    async def handle():
+        async with asgi_app.app.test_request_context('/api/tts', method='POST'):
+            return await make_response()
+
+    async def run():
+        response = await asyncio.ensure_future(handle())
+        await asyncio.sleep(0.05)
+        return response
+    return asyncio.run(run())
+
+
+def test_cached_file_is_streamed_in_chunks(disk_cache):
+    key = audio_cache_key('hello', 'alloy', 'gpt-4o-mini-tts')
+    disk_cache.put(key, AUDIO)
+
+    async def fetch():
+        response = await asgi_app.app.test_client().post('/api/tts', json={'text': 'hello'})
+        return response.status_code, response.headers['Content-Length'], await response.get_data()
+
+    assert asyncio.run(fetch()) == (200, str(len(AUDIO)), AUDIO)
+
+
+def test_unsent_cached_file_is_closed(disk_cache):
+    key = audio_cache_key('hello', 'alloy', 'gpt-4o-mini-tts')
+    disk_cache.put(key, AUDIO)
+    opened = []
+    lookup = disk_cache.lookup
+
+    def tracking_lookup(k):
+        audio_bytes, audio_file = lookup(k)
+        opened.append(audio_file)
+        return audio_bytes, audio_file
+
+    disk_cache.lookup = tracking_lookup
+    response = _respond_without_sending(lambda: asgi_app.cached_speech_response('hello', 'alloy', 'gpt-4o-mini-tts'))
+    assert opened[0] is not None and opened[0].closed
+    # The file is streamed, not read into memory up front
+    assert not isinstance(response.response, DataBody)
+
+
+def test_unsent_stream_closes_the_upstream(disk_cache):
+    _respond_without_sending(lambda: asgi_app.cached_speech_response(
+        'hello', 'alloy', 'gpt-4o-mini-tts', stream=True))
+    assert FakeUpstream.closed
+
+
+def test_sent_stream_is_relayed_cached_and_closed(disk_cache):
+    async def fetch():
+        response = await asgi_app.app.test_client().post('/api/tts', json={'text': 'hello', 'stream': True})
+        return await response.get_data()
+
+    assert asyncio.run(fetch()) == AUDIO
+    assert FakeUpstream.closed
+    assert disk_cache.get_bytes(audio_cache_key('hello', 'alloy', 'gpt-4o-mini-tts')) == AUDIO
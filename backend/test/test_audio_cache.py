@@ -0,0 +1,149 @@
+"""TTS audio cache tiers, eviction and the HTTP responses built on them"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from audio_cache import AudioCache, audio_cache_key
+
+
+def test_key_depends_on_every_input():
+    key = audio_cache_key('hello', 'alloy', 'tts-1')
+    assert key == audio_cache_key('hello', 'alloy', 'tts-1')
+    assert len({key, audio_cache_key('hello', 'nova', 'tts-1'), audio_cache_key('hello', 'alloy', 'tts-2'),
+                audio_cache_key('hello!', 'alloy', 'tts-1')}) == 4
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = AudioCache(max_memory_bytes=10)
+    cache.put('a', b'aaaa')
+    cache.put('b', b'bbbb')
+    assert cache.get_bytes('a') == b'aaaa'  # a is now most recent
+    cache.put('c', b'cccc')
+    assert cache.get_bytes('b') is None
+    assert cache.get_bytes('a') == b'aaaa'
+    assert cache.get_bytes('c') == b'cccc'
+    assert cache.stats()['memory_evictions'] == 1
+
+
+def test_oversized_audio_skips_memory_tier():
+    cache = AudioCache(max_memory_bytes=4)
+    cache.put('big', b'too big')
+    assert cache.get_bytes('big') is None
+
+
+def test_disk_tier_evicts_oldest_files(tmp_path):
+    cache = AudioCache(max_memory_bytes=0, cache_dir=str(tmp_path), max_disk_bytes=10)
+    cache.put('a', b'aaaa')
+    cache.put('b', b'bbbb')
+    cache.put('c', b'cccc')
+    assert not os.path.exists(cache.path_for('a'))
+    assert cache.get_bytes('a') is None
+    assert cache.get_bytes('c') == b'cccc'
+    assert cache.stats()['disk_evictions'] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    AudioCache(cache_dir=str(tmp_path)).put('key', b'audio')
+    cache = AudioCache(cache_dir=str(tmp_path))
+    data, audio_file = cache.lookup('key')
+    assert data is None
+    with audio_file:
+        assert audio_file.read() == b'audio'
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_lookup_file_stays_readable_after_eviction(tmp_path):
+    cache = AudioCache(max_memory_bytes=0, cache_dir=str(tmp_path), max_disk_bytes=8)
+    cache.put('a', b'aaaa')
+    _, audio_file = cache.lookup('a')
+    cache.put('b', b'bbbbbbbb')  # Evicts a while the caller still holds it
+    assert not os.path.exists(cache.path_for('a'))
+    with audio_file:
+        assert audio_file.read() == b'aaaa'
+
+
+def test_lookup_adopts_files_from_other_workers(tmp_path):
+    cache = AudioCache(cache_dir=str(tmp_path))
+    AudioCache(cache_dir=str(tmp_path)).put('key', b'audio')
+    assert cache.contains('key')
+    assert cache.get_bytes('key') == b'audio'
+    assert cache.stats()['disk_entries'] == 1
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    cache = AudioCache(max_memory_bytes=0, cache_dir=str(tmp_path))
+    cache.put('key', b'audio')
+    os.remove(cache.path_for('key'))
+    assert cache.lookup('key') == (None, None)
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['disk_entries'] == 0
+
+
+def test_contains_leaves_counters_alone(tmp_path):
+    cache = AudioCache(cache_dir=str(tmp_path))
+    cache.put('key', b'audio')
+    assert cache.contains('key') and not cache.contains('other')
+    stats = cache.stats()
+    assert stats['memory_hits'] + stats['disk_hits'] + stats['misses'] == 0
+
+
+@pytest.mark.parametrize('on_disk', [False, True])
+def test_writer_commits_streamed_chunks(tmp_path, on_disk):
+    cache = AudioCache(cache_dir=str(tmp_path) if on_disk else None)
+    writer = cache.writer('key')
+    writer.write(b'ab')
+    writer.write(b'cd')
+    assert cache.get_bytes('key') is None
+    writer.commit()
+    writer.abort()  # No-op after commit
+    assert cache.get_bytes('key') == b'abcd'
+
+
+def test_writer_abort_discards_partial_audio(tmp_path):
+    cache = AudioCache(cache_dir=str(tmp_path))
+    writer = cache.writer('key')
+    writer.write(b'partial')
+    writer.abort()
+    assert cache.get_bytes('key') is None
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    pytest.importorskip('playsound')
+    import main
+    cache = AudioCache(max_memory_bytes=0, cache_dir=str(tmp_path))
+    monkeypatch.setattr(main, 'audio_cache', cache)
+    key = audio_cache_key('hello', 'alloy', 'tts-1')
+    cache.put(key, b'0123456789')
+    return main.app.test_client(), key
+
+
+def test_audio_endpoint_sets_etag_and_honours_if_none_match(client):
+    client, key = client
+    response = client.get(f'/api/tts/audio/{key}')
+    assert response.status_code == 200
+    assert response.data == b'0123456789'
+    assert response.headers['ETag'] == f'"{key}"'
+    assert response.headers['X-Audio-Key'] == key
+    assert client.get(f'/api/tts/audio/{key}', headers={'If-None-Match': f'"{key}"'}).status_code == 304
+
+
+def test_audio_endpoint_serves_ranges_from_disk(client):
+    client, key = client
+    response = client.get(f'/api/tts/audio/{key}', headers={'Range': 'bytes=2-5'})
+    assert response.status_code == 206
+    assert response.data == b'2345'
+    assert response.headers['Content-Range'] == 'bytes 2-5/10'
+
+
+def test_default_cache_dir_does_not_depend_on_working_directory(tmp_path):
+    pytest.importorskip('playsound')
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {k: v for k, v in os.environ.items() if k != 'TTS_CACHE_DIR'}
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [backend, os.environ.get('PYTHONPATH')]))
+    out = subprocess.run([sys.executable, '-c', 'import app_services as s; print(s.TTS_CACHE_DIR)'],
+                         cwd=str(tmp_path), env=env, capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == os.path.join(backend, 'tts_cache')
@@ -0,0 +1,68 @@
+"""The single-pass command matcher classifies exactly like trying each pattern in turn"""
+import random
+import re
+
+import pytest
+
+from command_processor import VoiceCommandProcessor
+
+
+def reference_match(processor, cleaned_text):
+    """The original per-pattern loop: best confidence wins, earlier patterns win ties"""
+    best = ('unknown', 0.0, None)
+    for command_type, patterns in processor.command_patterns.items():
+        for pattern in patterns:
+            if re.search(pattern, cleaned_text, re.IGNORECASE):
+                confidence = 0.9 if re.match(pattern, cleaned_text, re.IGNORECASE) else 0.8
+                if confidence > best[1]:
+                    best = (command_type, confidence, pattern)
+    if best[0] == 'unknown' and len(cleaned_text.split()) >= 2:
+        return ('general_query', 0.5, None)
+    return best
+
+
+def _classify(processor, text):
+    command = processor.extract_command(text)
+    return command['type'], command['confidence'], command.get('pattern')
+
+
+def _expected(processor, text):
+    cleaned = processor.clean_text(text)
+    return reference_match(processor, cleaned) if cleaned else ('none', 0.0, None)
+
+
+TEXTS = [
+    'help', 'can you help me', 'what can you do', 'go to settings', 'open the menu', 'show profile',
+    'take me home', 'please go home now', 'search for weather', 'find the time', 'what time is it',
+    'stop', "that's all", 'I am done with this', 'say again please', 'turn the volume up', 'louder',
+    'what is the temperature today', 'translate to hindi', 'hindi mein bolo', 'please speak in hindi',
+    'हिंदी में बताओ', 'यह हिंदी में बोलो', 'tell me about flutter widgets', 'flutter', 'shower homework',
+    'timeline settings', 'um so like open', 'OK SEARCH Weather', 'tap the button then stop',
+    'run the report and search later', 'weather or not', 'select home', 'execute order', 'lookup hindi',
+    'showing the homepage', "that's all folks go home", '', '   ', 'um uh', 'a', 'what did you say about time',
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_matches_the_per_pattern_reference(text):
+    processor = VoiceCommandProcessor(cache_size=0)
+    assert _classify(processor, text) == _expected(processor, text)
+
+
+def test_matches_the_reference_on_random_phrases():
+    processor = VoiceCommandProcessor(cache_size=0)
+    vocabulary = sorted({word for text in TEXTS for word in text.split()} | {'the', 'my', 'now', 'please', 'to'})
+    rng = random.Random(1234)
+    for _ in range(2000):
+        text = ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(1, 6)))
+        assert _classify(processor, text) == _expected(processor, text), text
+
+
+def test_edited_pattern_table_still_matches_the_reference():
+    # A pattern without a leading word boundary turns off the shared \b prefix
+    processor = VoiceCommandProcessor(cache_size=0)
+    processor.command_patterns['weather'].append(r'rain(y|ing)?')
+    processor.command_patterns = {'volume': processor.command_patterns.pop('volume'), **processor.command_patterns}
+    processor.compile_patterns()
+    for text in ('is it raining', 'brainy louder', 'sound of rain', 'search rainfall', 'help with rain'):
+        assert _classify(processor, text) == _expected(processor, text), text
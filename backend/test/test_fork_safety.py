@@ -0,0 +1,106 @@
+"""Shared state stays usable in a forked worker even if a parent thread held its lock at fork time"""
+import os
+import threading
+
+import pytest
+
+from audio_cache import AudioCache
+from command_processor import VoiceCommandProcessor
+from metrics import StageMetrics
+from response_cache import ResponseCache
+from single_flight import SingleFlight
+from translation_memory import TranslationMemory
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+
+
+def _in_child(work) -> int:
+    """Run work() in a forked child and return its exit code (0 on success)"""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            # A deadlock shows up as the alarm killing the child
+            import signal
+            signal.alarm(5)
+            work()
+            code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def _fork_while_held(lock, work) -> int:
+    """Hold lock on another thread while forking, then run work() in the child"""
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with lock:
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(5)
+    try:
+        return _in_child(work)
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_audio_cache(tmp_path):
+    cache = AudioCache(cache_dir=str(tmp_path))
+    assert _fork_while_held(cache._lock, lambda: cache.put('key', b'audio')) == 0
+
+
+def test_response_cache(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / 'cache.db'))
+
+    def work():
+        cache.set('key', 'value')
+        assert cache.get('key') == 'value'
+    assert _fork_while_held(cache._lock, work) == 0
+
+
+def test_translation_memory():
+    memory = TranslationMemory()
+    assert _fork_while_held(memory._lock, lambda: memory.add('Hello.', 'नमस्ते।')) == 0
+
+
+def test_command_processor_cache():
+    processor = VoiceCommandProcessor(cache_size=8)
+    assert _fork_while_held(processor._cache_lock, lambda: processor.extract_command('go back')) == 0
+
+
+def test_stage_metrics():
+    metrics = StageMetrics()
+    metrics.observe('tts', 0.1)
+    assert _fork_while_held(metrics._histograms['tts']._lock, lambda: metrics.observe('tts', 0.2)) == 0
+    assert _fork_while_held(metrics._lock, lambda: metrics.observe('gemini', 0.2)) == 0
+
+
+def test_single_flight_forgets_parent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 'parent'
+
+    leader = threading.Thread(target=flight.do, args=('key', slow))
+    leader.start()
+    started.wait(5)
+    try:
+        # Without the reset the child would wait on the parent's call forever
+        def work():
+            assert flight.do('key', lambda: 'child') == 'child'
+        assert _in_child(work) == 0
+        assert _fork_while_held(flight._lock, work) == 0
+    finally:
+        release.set()
+        leader.join()
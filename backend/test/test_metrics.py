@@ -0,0 +1,133 @@
+"""Stage histograms, their quantile estimates and the Prometheus exposition"""
+import os
+import re
+import threading
+
+import pytest
+
+from metrics import Histogram, StageMetrics
+
+
+def test_quantiles_interpolate_within_buckets():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    snap = histogram.snapshot()
+    assert snap['counts'] == [1, 2, 1, 0]
+    assert snap['count'] == 4 and snap['sum'] == 6.5 and snap['max'] == 3.0
+    assert snap['quantiles'][0.5] == pytest.approx(1.5)  # Halfway through the (1, 2] bucket
+    assert snap['quantiles'][0.99] == 3.0  # Capped at the largest observation
+
+
+def test_empty_histogram_reports_zero_quantiles():
+    assert Histogram().snapshot()['quantiles'] == {0.5: 0.0, 0.95: 0.0, 0.99: 0.0}
+
+
+def test_overflow_bucket_uses_observed_max():
+    histogram = Histogram(buckets=(1.0,))
+    histogram.observe(7.0)
+    assert histogram.snapshot()['counts'] == [0, 1]
+    assert histogram.snapshot()['quantiles'][0.5] == pytest.approx(4.0)
+
+
+def test_timer_records_even_when_the_body_raises():
+    metrics = StageMetrics()
+    with pytest.raises(ValueError):
+        with metrics.time('gemini'):
+            raise ValueError
+    assert metrics.stats()['gemini']['count'] == 1
+
+
+def test_prometheus_exposition_format():
+    metrics = StageMetrics(buckets=(0.1, 1.0))
+    metrics.observe('tts', 0.05)
+    metrics.observe('tts', 0.5)
+    metrics.observe('gemini', 2.0)
+    text = metrics.render_prometheus()
+    lines = text.splitlines()
+    assert text.endswith('\n')
+    assert lines[:2] == ['# HELP voice_stage_duration_seconds Time spent in each request-handling stage',
+                         '# TYPE voice_stage_duration_seconds histogram']
+    assert 'voice_stage_duration_seconds_bucket{stage="tts",le="0.1"} 1' in lines
+    assert 'voice_stage_duration_seconds_bucket{stage="tts",le="1.0"} 2' in lines
+    assert 'voice_stage_duration_seconds_bucket{stage="tts",le="+Inf"} 2' in lines
+    assert 'voice_stage_duration_seconds_count{stage="gemini"} 1' in lines
+    assert 'voice_stage_duration_seconds_sum{stage="gemini"} 2.0' in lines
+    assert '# TYPE voice_stage_duration_quantile_seconds gauge' in lines
+    sample = re.compile(r'^[a-z_]+\{(stage="[a-z_]+")(,(le|quantile)="[^"]+")?\} [0-9.e+-]+$')
+    assert all(line.startswith('# ') or sample.match(line) for line in lines)
+
+
+def test_prometheus_output_parses_with_the_official_parser():
+    parser = pytest.importorskip('prometheus_client.parser')
+    metrics = StageMetrics()
+    metrics.observe('transcription', 0.3)
+    families = {family.name: family for family in parser.text_string_to_metric_families(metrics.render_prometheus())}
+    assert families['voice_stage_duration_seconds'].type == 'histogram'
+    assert families['voice_stage_duration_quantile_seconds'].type == 'gauge'
+    assert len(families['voice_stage_duration_quantile_seconds'].samples) == 3
+
+
+def test_scrapes_survive_new_stages_being_added():
+    metrics = StageMetrics()
+    stop = threading.Event()
+    errors = []
+
+    def scrape():
+        while not stop.is_set():
+            try:
+                metrics.render_prometheus()
+                metrics.stats()
+            except RuntimeError as e:
+                errors.append(e)
+                return
+
+    scraper = threading.Thread(target=scrape)
+    scraper.start()
+    for i in range(2000):
+        metrics.observe(f'stage_{i}', 0.01)
+    stop.set()
+    scraper.join()
+    assert errors == []
+    assert len(metrics.stats()) == 2000
+
+
+def _count_line(text, stage):
+    return next(line for line in text.splitlines() if line.startswith(f'voice_stage_duration_seconds_count{{stage="{stage}"}}'))
+
+
+def test_shared_directory_sums_every_process(tmp_path):
+    # Two registries stand in for two worker processes
+    first, second = StageMetrics(buckets=(0.1, 1.0)), StageMetrics(buckets=(0.1, 1.0))
+    first.share_across_processes(str(tmp_path))
+    second.share_across_processes(str(tmp_path))
+    first.observe('tts', 0.05)
+    second.observe('tts', 0.5)
+    second.observe('tts', 0.5)
+    second.render_prometheus()  # A scrape writes the answering process's snapshot
+    text = first.render_prometheus()
+    assert _count_line(text, 'tts') == 'voice_stage_duration_seconds_count{stage="tts"} 3'
+    assert 'voice_stage_duration_seconds_bucket{stage="tts",le="0.1"} 1' in text.splitlines()
+    assert first.stats() == second.stats()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_worker_counts_only_its_own_observations(tmp_path):
+    metrics = StageMetrics()
+    metrics.share_across_processes(str(tmp_path))
+    metrics.observe('tts', 0.1)
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            metrics.observe('tts', 0.2)
+            metrics.stats()
+            code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    # The parent's observation before the fork isn't counted twice, and the
+    # exited worker's totals stay so the count never goes backwards
+    assert metrics.stats()['tts']['count'] == 2
+    assert len(list(tmp_path.glob('*.json'))) == 2
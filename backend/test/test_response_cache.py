@@ -0,0 +1,138 @@
+"""Summary response cache: TTL, LRU, the SQLite tier and canonical request keys"""
+import json
+import sqlite3
+import threading
+
+import pytest
+
+import response_cache
+import summarizer_service
+from response_cache import ResponseCache, make_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=60)
+    cache.set('key', 'value')
+    clock[0] += 60
+    assert cache.get('key') == 'value'
+    clock[0] += 1
+    assert cache.get('key') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_zero_ttl_never_expires(clock):
+    cache = ResponseCache(ttl=0)
+    cache.set('key', 'value')
+    clock[0] += 10 ** 9
+    assert cache.get('key') == 'value'
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    assert cache.get('a') == '1'  # b is now the oldest
+    cache.set('c', '3')
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('1', '3')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_sqlite_tier_survives_restart_and_refills_memory(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    ResponseCache(db_path=path).set('key', 'नमस्ते')
+    cache = ResponseCache(db_path=path)
+    assert cache.get('key') == 'नमस्ते'
+    assert cache.get('key') == 'नमस्ते'
+    stats = cache.stats()
+    assert (stats['disk_hits'], stats['hits']) == (1, 1)
+
+
+def test_sqlite_tier_drops_expired_rows(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    ResponseCache(db_path=path, ttl=60).set('key', 'value')
+    clock[0] += 61
+    cache = ResponseCache(db_path=path, ttl=60)
+    assert cache.get('key') is None
+    clock[0] -= 61
+    assert cache.get('key') is None  # Deleted, not just skipped
+
+
+def test_memory_tier_can_be_disabled(tmp_path):
+    cache = ResponseCache(max_entries=0, db_path=str(tmp_path / 'cache.db'))
+    cache.set('key', 'value')
+    assert cache.stats()['size'] == 0
+    assert cache.get('key') == 'value'
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / 'cache.db'))
+    cache.set('key', 'value')
+    cache.clear()
+    assert cache.get('key') is None
+
+
+def _disk_keys(path):
+    with sqlite3.connect(path) as db:
+        return sorted(key for (key,) in db.execute('SELECT key FROM responses'))
+
+
+def test_sqlite_tier_keeps_only_the_newest_rows(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(max_entries=0, db_path=path, max_disk_entries=3, prune_every=1)
+    for i in range(5):
+        clock[0] += 1
+        cache.set(f'key{i}', 'value')
+    assert _disk_keys(path) == ['key2', 'key3', 'key4']
+    assert cache.stats()['disk_evictions'] == 2
+
+
+def test_sqlite_tier_sweeps_expired_rows_without_reading_them(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(db_path=path, ttl=60, prune_every=2)
+    cache.set('old', 'value')
+    clock[0] += 61
+    cache.set('new', 'value')
+    assert _disk_keys(path) == ['new']
+
+
+def test_sqlite_tier_is_trimmed_on_open(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(db_path=path)
+    for i in range(4):
+        clock[0] += 1
+        cache.set(f'key{i}', 'value')
+    ResponseCache(db_path=path, max_disk_entries=2)
+    assert _disk_keys(path) == ['key2', 'key3']
+
+
+def test_memory_hits_dont_wait_for_sqlite(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / 'cache.db'))
+    cache.set('key', 'value')
+    result = []
+    with cache._db_lock:  # A slow disk write in another thread
+        reader = threading.Thread(target=lambda: result.append(cache.get('key')))
+        reader.start()
+        reader.join(2)
+    assert result == ['value']
+
+
+def test_make_cache_key_is_stable_and_order_sensitive():
+    assert make_cache_key('summary', 'a', 1) == make_cache_key('summary', 'a', 1)
+    assert make_cache_key('summary', 'a', 1) != make_cache_key('summary', 1, 'a')
+
+
+def test_summary_key_ignores_formatting_and_volatile_fields():
+    page = {'page': 'Home', 'userInput': '  where are settings? ', 'timestamp': 1}
+    reordered = {'timestamp': 2, 'userInput': 'where are settings?', 'page': 'Home'}
+    key = summarizer_service._summary_cache_key(json.dumps(page), False)
+    assert key == summarizer_service._summary_cache_key(json.dumps(reordered, indent=2), False)
+    assert key != summarizer_service._summary_cache_key(json.dumps(page), True)
+    assert key != summarizer_service._summary_cache_key(json.dumps({**page, 'page': 'Settings'}), False)
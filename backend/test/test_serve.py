@@ -0,0 +1,51 @@
+"""Worker and Whisper thread defaults for the gunicorn server"""
+import importlib
+
+import pytest
+
+import serve
+import stt
+
+
+@pytest.fixture
+def local_serve(monkeypatch):
+    monkeypatch.setenv('STT_BACKEND', 'local')
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.setattr(stt, 'WHISPER_CPU_THREADS', 0)
+    yield importlib.reload(serve)
+    monkeypatch.undo()
+    importlib.reload(serve)
+
+
+def test_local_stt_defaults_to_one_worker(local_serve):
+    assert local_serve.SERVER_WORKERS == 1
+    assert local_serve.server_options(object())['workers'] == 1
+
+
+def test_explicit_workers_split_the_whisper_threads(local_serve, monkeypatch):
+    monkeypatch.setattr(local_serve.os, 'cpu_count', lambda: 8)
+    local_serve.split_whisper_threads(4)
+    assert stt.WHISPER_CPU_THREADS == 2
+
+
+def test_ample_cores_keep_the_ctranslate2_default(local_serve, monkeypatch):
+    monkeypatch.setattr(local_serve.os, 'cpu_count', lambda: 64)
+    local_serve.split_whisper_threads(2)
+    assert stt.WHISPER_CPU_THREADS == 0
+
+
+def test_configured_whisper_threads_are_kept(local_serve, monkeypatch):
+    monkeypatch.setattr(stt, 'WHISPER_CPU_THREADS', 6)
+    local_serve.split_whisper_threads(8)
+    assert stt.WHISPER_CPU_THREADS == 6
+
+
+def test_remote_stt_uses_every_core(monkeypatch):
+    monkeypatch.setenv('STT_BACKEND', 'remote')
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.setattr('os.cpu_count', lambda: 6)
+    try:
+        assert importlib.reload(serve).SERVER_WORKERS == 6
+    finally:
+        monkeypatch.undo()
+        importlib.reload(serve)
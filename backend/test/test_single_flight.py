@@ -0,0 +1,124 @@
+"""Single-flight coalescing of identical in-flight calls"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', fetch))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    # Let every follower join the leader's call before it finishes
+    deadline = time.monotonic() + 5
+    while flight.stats()['coalesced'] < 9 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ['answer'] * 10
+    assert len(calls) == 1
+    assert flight.stats() == {'executed': 1, 'coalesced': 9, 'in_flight': 0}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.do('a', lambda: 3) == 3  # The first call for 'a' already finished
+    assert flight.stats()['executed'] == 3
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError('upstream down')
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.stats()['coalesced'] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_async_calls_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async('key', fetch) for _ in range(10)))
+
+    assert asyncio.run(run()) == ['answer'] * 10
+    assert len(calls) == 1
+    assert flight.stats() == {'executed': 1, 'coalesced': 9, 'in_flight': 0}
+
+
+def test_cancelling_one_async_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def run():
+        first = asyncio.ensure_future(flight.do_async('key', fetch))
+        second = asyncio.ensure_future(flight.do_async('key', fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 'answer'
+
+
+def test_async_exception_reaches_every_caller():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError('upstream down')
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async('key', fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()['executed'] == 1
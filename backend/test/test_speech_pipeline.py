@@ -0,0 +1,85 @@
+"""Sentence-pipelined synthesis of a streamed answer"""
+import threading
+
+import pytest
+import requests
+
+import summarizer_service
+from audio_cache import AudioCache, audio_cache_key
+from speech_pipeline import iter_sentences, synthesize_pipelined
+
+HINDI_PIECES = ['इस पेज पर आप मेनू ', 'से सेटिंग्स खोल सकते हैं। होम ', 'पेज पर डैशबोर्ड दिखता है।']
+HINDI_SENTENCES = ['इस पेज पर आप मेनू से सेटिंग्स खोल सकते हैं।', 'होम पेज पर डैशबोर्ड दिखता है।']
+
+
+def test_iter_sentences_splits_on_danda_and_punctuation():
+    assert list(iter_sentences(['Open the menu. Then', ' tap Settings! Done'])) == [
+        'Open the menu.', 'Then tap Settings!', 'Done']
+    assert list(iter_sentences(HINDI_PIECES)) == HINDI_SENTENCES
+
+
+def test_pipeline_yields_audio_in_sentence_order():
+    # The first sentence finishes last, but its audio still comes first
+    first_done = threading.Event()
+
+    def synthesize(sentence):
+        if sentence == 'One.':
+            first_done.wait(0.2)
+        else:
+            first_done.set()
+        return sentence.encode()
+
+    assert list(synthesize_pipelined(iter(['One. Two. ', 'Three.']), synthesize)) == [b'One.', b'Two.', b'Three.']
+
+
+def test_streamed_hindi_reaches_tts_and_cache_intact(gemini_sse):
+    gemini_sse(HINDI_PIECES)
+    cache = AudioCache(cache_dir=None)
+    spoken = []
+
+    def synthesize(sentence):
+        spoken.append(sentence)
+        audio = sentence.encode('utf-8')
+        cache.put(audio_cache_key(sentence, 'nova', 'gpt-4o-mini-tts'), audio)
+        return audio
+
+    pieces = summarizer_service.summarize_stream('where are settings? (hindi speech)', translate_to_hindi=True)
+    segments = list(synthesize_pipelined(pieces, synthesize))
+    assert spoken == HINDI_SENTENCES
+    assert [segment.decode('utf-8') for segment in segments] == HINDI_SENTENCES
+    for sentence in HINDI_SENTENCES:
+        assert cache.get_bytes(audio_cache_key(sentence, 'nova', 'gpt-4o-mini-tts')) == sentence.encode('utf-8')
+
+
+@pytest.fixture
+def speak_client(monkeypatch):
+    pytest.importorskip('playsound')
+    import main
+    monkeypatch.setattr(main, 'openai_client', object())
+    monkeypatch.setattr(main, 'synthesize_mp3', lambda sentence, voice, model: sentence.encode('utf-8'))
+    return main.app.test_client()
+
+
+def test_speak_stream_reports_a_missing_gemini_key(speak_client, monkeypatch):
+    monkeypatch.setattr(summarizer_service, 'GEMINI_API_KEY', None)
+    response = speak_client.post('/api/speak/stream', json={'text': 'hello (no key)'})
+    assert response.status_code == 500
+    assert 'GEMINI_API_KEY' in response.get_json()['detail']
+
+
+def test_speak_stream_reports_a_gemini_failure(speak_client, monkeypatch):
+    class Session:
+        def post(self, url, **kwargs):
+            raise requests.ConnectionError('gemini unreachable')
+
+    monkeypatch.setattr(summarizer_service, 'get_session', Session)
+    response = speak_client.post('/api/speak/stream', json={'text': 'hello (gemini down)'})
+    assert response.status_code == 500
+    assert 'gemini unreachable' in response.get_json()['detail']
+
+
+def test_speak_stream_speaks_every_sentence(speak_client, gemini_sse):
+    gemini_sse(HINDI_PIECES)
+    response = speak_client.post('/api/speak/stream', json={'text': 'settings? (speak stream)', 'translate_to_hindi': True})
+    assert response.status_code == 200
+    assert response.data.decode('utf-8') == ''.join(HINDI_SENTENCES)
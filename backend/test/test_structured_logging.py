@@ -0,0 +1,104 @@
+"""JSON log formatting, correlation IDs, debug sampling and the bounded log queue"""
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+import structured_logging
+from structured_logging import JsonFormatter, begin_request, end_request
+
+
+@pytest.fixture(autouse=True)
+def clear_request():
+    yield
+    end_request()
+
+
+def _record(level=logging.INFO, msg='hello %s', args=('world',), exc_info=None, **extra):
+    record = logging.LogRecord('app', level, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_formatter_emits_one_json_object_with_extra_fields():
+    record = _record(request_id='abc123', stage='tts', elapsed_ms=12.5)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'app'
+    assert entry['msg'] == 'hello world'
+    assert entry['request_id'] == 'abc123'
+    assert entry['stage'] == 'tts' and entry['elapsed_ms'] == 12.5
+    assert entry['ts'].endswith('Z')
+
+
+def test_formatter_keeps_non_ascii_text():
+    line = JsonFormatter().format(_record(msg='नमस्ते', args=None))
+    assert 'नमस्ते' in line
+
+
+def test_valid_incoming_request_id_is_kept():
+    assert begin_request('req-42.a:b') == 'req-42.a:b'
+    assert structured_logging.request_id_var.get() == 'req-42.a:b'
+
+
+@pytest.mark.parametrize('incoming', [None, '', 'has space', 'x' * 65, 'bad\nheader'])
+def test_invalid_incoming_request_id_is_replaced(incoming):
+    request_id = begin_request(incoming)
+    assert request_id != incoming
+    assert len(request_id) == 32
+
+
+def test_end_request_clears_the_id():
+    begin_request('abc')
+    end_request()
+    assert structured_logging.request_id_var.get() is None
+
+
+def test_filter_tags_records_with_the_request_id():
+    begin_request('abc')
+    record = _record()
+    assert structured_logging._ContextFilter().filter(record)
+    assert record.request_id == 'abc'
+
+
+@pytest.mark.parametrize('rate, kept', [(0.0, False), (1.0, True)])
+def test_debug_sampling_is_decided_per_request(monkeypatch, rate, kept):
+    monkeypatch.setattr(structured_logging, 'LOG_DEBUG_SAMPLE_RATE', rate)
+    begin_request('abc')
+    # Changing the rate mid-request doesn't change the request's decision
+    monkeypatch.setattr(structured_logging, 'LOG_DEBUG_SAMPLE_RATE', 1.0 - rate)
+    log_filter = structured_logging._ContextFilter()
+    assert all(log_filter.filter(_record(level=logging.DEBUG)) is kept for _ in range(20))
+    assert log_filter.filter(_record(level=logging.INFO))
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = structured_logging._QueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.emit(_record())
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_logging_stats_reports_queue_counts(monkeypatch):
+    handler = structured_logging._QueueHandler(queue.Queue(1))
+    monkeypatch.setattr(structured_logging, '_handler', handler)
+    handler.emit(_record())
+    handler.emit(_record())
+    assert structured_logging.logging_stats() == {'queued': 1, 'dropped': 1}
+
+
+def test_prepare_merges_args_and_renders_traceback():
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = _record(exc_info=sys.exc_info())
+    prepared = structured_logging._QueueHandler(queue.Queue()).prepare(record)
+    assert prepared is not record
+    assert prepared.msg == 'hello world' and prepared.args is None
+    assert prepared.exc_info is None
+    assert 'ValueError: boom' in prepared.exc_text
+    entry = json.loads(JsonFormatter().format(prepared))
+    assert 'Traceback' in entry['exc']
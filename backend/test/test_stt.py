@@ -0,0 +1,124 @@
+"""Live-microphone end-pointing with synthetic audio blocks"""
+import types
+
+import numpy as np
+import pytest
+
+import stt
+
+
+def _block(level_db):
+    # Alternating +/-a has an RMS of exactly a
+    amplitude = 10 ** (level_db / 20)
+    return np.resize(np.array([amplitude, -amplitude], dtype=np.float32), stt.frames_per_block)
+
+
+def _feed(detector, levels):
+    utterances = []
+    for level_db in levels:
+        utterance = detector.add_block(_block(level_db))
+        if utterance is not None:
+            utterances.append(utterance)
+    return utterances
+
+
+def test_speech_followed_by_silence_is_one_utterance():
+    detector = stt.UtteranceDetector()
+    utterances = _feed(detector, [-70] * 4 + [-20] * 8 + [-70] * 4)
+    assert len(utterances) == 1
+    # Pre-roll, the speech and the trailing silence that ended it
+    blocks = int(stt.speech_pad_duration / stt.block_duration) + 8 + int(stt.end_silence_duration / stt.block_duration)
+    assert len(utterances[0]) == blocks * stt.frames_per_block
+
+
+def test_single_block_click_is_dropped():
+    detector = stt.UtteranceDetector()
+    assert _feed(detector, [-70] * 4 + [-10] + [-70] * 8) == []
+
+
+def test_two_speech_blocks_are_kept():
+    detector = stt.UtteranceDetector()
+    assert len(_feed(detector, [-70] * 4 + [-20] * 2 + [-70] * 4)) == 1
+
+
+def test_sustained_noise_is_absorbed_into_the_noise_floor():
+    detector = stt.UtteranceDetector()
+    vad = detector.vad
+    # A new noise source is taken for speech at first, but only until the floor catches up
+    assert len(_feed(detector, [-40] * 200)) <= 1
+    assert vad.noise_floor_db > -40 - vad.margin_db
+    assert _feed(detector, [-40] * 200) == []
+
+
+def test_speech_is_still_heard_over_absorbed_noise():
+    detector = stt.UtteranceDetector()
+    _feed(detector, [-40] * 200)
+    utterances = _feed(detector, [-15] * 16 + [-40] * 4)
+    assert len(utterances) == 1
+
+
+def test_long_speech_is_sent_in_pieces():
+    detector = stt.UtteranceDetector()
+    blocks = int(stt.max_utterance_duration / stt.block_duration)
+    utterances = _feed(detector, [-70] * 4 + [-20] * (blocks + 8) + [-70] * 4)
+    assert len(utterances) == 2
+    # The rising noise floor doesn't cut continuous speech short
+    assert len(utterances[0]) == stt.max_utterance_duration * stt.samplerate
+
+
+def test_ring_buffer_keeps_the_newest_samples_in_order():
+    ring = stt.AudioRingBuffer(5)
+    for start in range(0, 12, 3):
+        ring.write(np.arange(start, start + 3, dtype=np.float32))
+    assert ring.total == 12 and ring.oldest == 7
+    # Frames 7-11 straddle the wrap point but come out contiguous
+    assert ring.read(7, 12).tolist() == [7, 8, 9, 10, 11]
+    assert ring.read(9, 11).tolist() == [9, 10]
+
+
+def test_ring_buffer_block_larger_than_capacity_keeps_its_tail():
+    ring = stt.AudioRingBuffer(4)
+    ring.write(np.arange(10, dtype=np.float32))
+    assert ring.total == 10
+    assert ring.read(6, 10).tolist() == [6, 7, 8, 9]
+
+
+def test_ring_buffer_rejects_overwritten_or_unwritten_frames():
+    ring = stt.AudioRingBuffer(4)
+    ring.write(np.arange(6, dtype=np.float32))
+    for start, end in ((1, 3), (4, 7), (5, 4)):
+        with pytest.raises(ValueError):
+            ring.read(start, end)
+
+
+class _FakeWindowModel:
+    """Returns the words overlapping the window it is given, timed relative to its start"""
+
+    def __init__(self, words, window_start, window_length):
+        self.words = words
+        self.window_start = window_start
+        self.window_length = window_length
+
+    def transcribe(self, audio_data, **kwargs):
+        words = [types.SimpleNamespace(word=f' {text}', start=max(start - self.window_start, 0),
+                                       end=min(end - self.window_start, self.window_length))
+                 for text, start, end in self.words
+                 if start < self.window_start + self.window_length and end > self.window_start]
+        return [types.SimpleNamespace(words=words)], None
+
+
+def test_overlapping_windows_emit_each_word_once():
+    # Absolute (word, start, end) seconds: "across" is emitted by the first window and seen again
+    # in the second one's overlap; "four" straddles the end of the first window
+    words = [('one', 0.2, 0.6), ('across', 1.7, 2.3), ('three', 2.4, 2.7), ('four', 2.8, 3.3), ('five', 4.0, 4.4)]
+    hop = stt.chunk_duration - stt.overlap_duration
+    committed_until = 0.0
+    texts = []
+    for window_start in range(0, 6, hop):
+        model = _FakeWindowModel(words, window_start, stt.chunk_duration)
+        text, committed_until = stt.transcribe_window(
+            None, window_start, window_start + hop, committed_until, whisper_model=model)
+        texts.append(text)
+    # Words from the cutoff on wait for the next window, which sees them whole
+    assert texts == ['one across', 'three four', 'five']
+    assert ' '.join(texts).split() == [word for word, _, _ in words]
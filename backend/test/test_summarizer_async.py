@@ -0,0 +1,37 @@
+"""The async summarize path keeps cache and translation-memory I/O off the event loop"""
+import asyncio
+import threading
+
+import summarizer_service
+
+
+def test_summarize_async_runs_steps_in_worker_threads(monkeypatch):
+    writes = []
+
+    async def generate(prompt, model_name, timeout):
+        return 'Open Settings from the menu.'
+
+    def record_set(key, value):
+        writes.append((threading.get_ident(), value))
+
+    monkeypatch.setattr(summarizer_service, '_generate_content_async', generate)
+    monkeypatch.setattr(summarizer_service.summary_cache, 'set', record_set)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        summary = await summarizer_service.summarize_async('where are settings? (async steps)')
+        return loop_thread, summary
+
+    loop_thread, summary = asyncio.run(run())
+    assert summary == 'Open Settings from the menu.'
+    assert [value for _, value in writes] == [summary]
+    assert writes[0][0] != loop_thread
+
+
+def test_gemini_errors_reach_the_steps(monkeypatch):
+    async def fail(prompt, model_name, timeout):
+        raise RuntimeError('upstream down')
+
+    monkeypatch.setattr(summarizer_service, '_generate_content_async', fail)
+    text = 'Open Settings from the menu.'
+    assert asyncio.run(summarizer_service.translate_to_hindi_text_async(text)) == text
@@ -0,0 +1,18 @@
+"""Streamed summaries decode Gemini's SSE as UTF-8"""
+import summarizer_service
+
+HINDI_PIECES = ['इस पेज पर आप ', 'मेनू से सेटिंग्स खोल सकते हैं। ', 'होम पेज पर डैशबोर्ड दिखता है।' * 20]
+
+
+def test_stream_decodes_hindi(gemini_sse):
+    gemini_sse(HINDI_PIECES)
+    pieces = list(summarizer_service.summarize_stream('where are settings? (hindi stream)', translate_to_hindi=True))
+    assert pieces == HINDI_PIECES
+
+
+def test_streamed_hindi_is_cached_intact(gemini_sse):
+    gemini_sse(HINDI_PIECES)
+    question = 'where are settings? (hindi cache)'
+    list(summarizer_service.summarize_stream(question, translate_to_hindi=True))
+    key = summarizer_service._summary_cache_key(question, True)
+    assert summarizer_service.summary_cache.get(key) == ''.join(HINDI_PIECES).strip()
@@ -0,0 +1,194 @@
+"""Behaviour of the bounded local-STT worker pool"""
+import asyncio
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+import stt
+from transcription_service import TranscriptionBusy, TranscriptionService, TranscriptionTimeout
+
+
+def _service(transcribe, **kwargs):
+    return TranscriptionService(model_factory=lambda: 'model', transcribe=transcribe, **kwargs)
+
+
+def test_transcribes_on_worker():
+    service = _service(lambda audio, model: f"{audio.decode()} via {model}")
+    assert service.transcribe(b'hello', timeout=5) == 'hello via model'
+    assert service.stats()['completed'] == 1
+
+
+def test_full_queue_raises_busy():
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking(audio, model):
+        started.set()
+        release.wait(5)
+        return ''
+
+    service = _service(blocking, workers=1, queue_size=1)
+    try:
+        service.submit(b'running')
+        assert started.wait(5)
+        service.submit(b'queued')
+        with pytest.raises(TranscriptionBusy):
+            service.submit(b'rejected')
+        assert service.stats()['rejected'] == 1
+    finally:
+        release.set()
+
+
+def test_timeout_raises_and_cancels_queued_job():
+    release = threading.Event()
+    calls = []
+
+    def blocking(audio, model):
+        calls.append(audio)
+        release.wait(5)
+        return ''
+
+    service = _service(blocking, workers=1, queue_size=2)
+    service.submit(b'running')
+    with pytest.raises(TranscriptionTimeout):
+        service.transcribe(b'late', timeout=0.05)
+    release.set()
+    assert service.transcribe(b'next', timeout=5) == ''
+    assert b'late' not in calls
+    assert service.stats()['timeouts'] == 1
+
+
+def test_queued_clips_are_batched():
+    release = threading.Event()
+    started = threading.Event()
+    batches = []
+
+    def first(audio, model):
+        started.set()
+        release.wait(5)
+        return 'first'
+
+    def transcribe_batch(audio_list, model, batch_size):
+        batches.append(len(audio_list))
+        return [f"clip {len(audio)}" for audio in audio_list]
+
+    service = _service(first, workers=1, queue_size=8, batch_size=4, batch_wait_ms=50,
+                       decode=lambda audio: [0.0] * len(audio), transcribe_batch=transcribe_batch)
+    blocker = service.submit(b'x')
+    assert started.wait(5)
+    futures = [service.submit(b'a' * n) for n in (1, 2, 3)]
+    release.set()
+    assert blocker.result(5) == 'first'
+    assert [f.result(5) for f in futures] == ['clip 1', 'clip 2', 'clip 3']
+    assert batches == [3]
+
+
+def test_batch_falls_back_without_batched_pipeline(monkeypatch):
+    # faster-whisper before 1.2 has no usable BatchedInferencePipeline
+    monkeypatch.setitem(sys.modules, 'faster_whisper', types.ModuleType('faster_whisper'))
+    monkeypatch.setattr(stt, 'transcribe_audio', lambda audio, model=None: f"{len(audio)} samples")
+    assert stt.transcribe_batch([[0.0] * 2, [0.0] * 5], whisper_model='model') == ['2 samples', '5 samples']
+
+
+class _FakeBatchedPipeline:
+    """Mimics faster-whisper 1.2: clip_timestamps in seconds, packed into chunks of up to chunk_length"""
+    windows = []
+
+    def __init__(self, model):
+        self.model = model
+
+    def transcribe(self, audio, clip_timestamps, chunk_length=None, vad_filter=True, **kwargs):
+        assert not vad_filter
+        max_samples = (chunk_length or 30) * stt.samplerate
+        chunks = []  # Same packing as faster_whisper.vad.collect_chunks
+        current, offset, total = None, 0, 0
+        for clip in clip_timestamps:
+            start, end = int(clip['start'] * stt.samplerate), int(clip['end'] * stt.samplerate)
+            if current is not None and len(current) + end - start > max_samples:
+                chunks.append((total, current))
+                total += len(current)
+                current = None
+            current = audio[start:end] if current is None else np.concatenate((current, audio[start:end]))
+        chunks.append((total, current))
+        segments = []
+        for offset, chunk in chunks:
+            # Each clip's samples carry its number, so the "speech" heard in a window is known
+            heard = sorted({int(round(v * 10)) for v in chunk if v})
+            self.windows.append(heard)
+            start = offset / stt.samplerate
+            segments.append(types.SimpleNamespace(
+                start=start, end=start + len(chunk) / stt.samplerate,
+                text=' '.join(f'clip{n}' for n in heard)))
+        return iter(segments), None
+
+
+def _fake_faster_whisper(monkeypatch, version):
+    module = types.ModuleType('faster_whisper')
+    module.__version__ = version
+    module.BatchedInferencePipeline = _FakeBatchedPipeline
+    _FakeBatchedPipeline.windows = []
+    monkeypatch.setitem(sys.modules, 'faster_whisper', module)
+
+
+def test_batch_decodes_each_clip_in_its_own_window(monkeypatch):
+    _fake_faster_whisper(monkeypatch, '1.2.0')
+    clips = [np.full(2 * stt.samplerate, n / 10, dtype=np.float32) for n in (1, 2, 3)]
+    assert stt.transcribe_batch(clips, whisper_model='model') == ['clip1', 'clip2', 'clip3']
+    # Three windows in one batch, none holding a second caller's audio
+    assert _FakeBatchedPipeline.windows == [[1], [2], [3]]
+
+
+def test_batch_keeps_empty_clips_separate(monkeypatch):
+    _fake_faster_whisper(monkeypatch, '1.2.1')
+    clips = [np.full(stt.samplerate, 0.1, dtype=np.float32), np.zeros(stt.samplerate, dtype=np.float32),
+             np.full(30 * stt.samplerate, 0.3, dtype=np.float32)]
+    assert stt.transcribe_batch(clips, whisper_model='model') == ['clip1', '', 'clip3']
+
+
+def test_batch_falls_back_on_sample_based_clip_timestamps(monkeypatch):
+    # faster-whisper 1.1 has the pipeline but reads clip_timestamps as samples
+    _fake_faster_whisper(monkeypatch, '1.1.1')
+    monkeypatch.setattr(stt, 'transcribe_audio', lambda audio, model=None: f"{len(audio)} samples")
+    assert stt.transcribe_batch([[0.0] * 2, [0.0] * 5], whisper_model='model') == ['2 samples', '5 samples']
+    assert _FakeBatchedPipeline.windows == []
+
+
+def test_transcribe_async_awaits_the_pool():
+    service = _service(lambda audio, model: audio.decode().upper())
+    assert asyncio.run(service.transcribe_async(b'hi', timeout=5)) == 'HI'
+
+
+def test_transcribe_async_times_out():
+    release = threading.Event()
+    service = _service(lambda audio, model: release.wait(5) and '', workers=1, queue_size=2)
+    try:
+        with pytest.raises(TranscriptionTimeout):
+            asyncio.run(service.transcribe_async(b'slow', timeout=0.05))
+    finally:
+        release.set()
+
+
+def test_errors_reach_the_caller_and_are_counted():
+    def broken(audio, model):
+        raise ValueError('undecodable audio')
+
+    service = _service(broken)
+    with pytest.raises(ValueError, match='undecodable'):
+        service.transcribe(b'junk', timeout=5)
+    assert service.stats()['failed'] == 1
+
+
+def test_each_worker_loads_its_model_once():
+    models = []
+
+    def factory():
+        models.append(object())
+        return models[-1]
+
+    service = TranscriptionService(workers=1, model_factory=factory,
+                                   transcribe=lambda audio, model: str(id(model)))
+    results = {service.transcribe(b'x', timeout=5) for _ in range(3)}
+    assert len(models) == 1 and results == {str(id(models[0]))}
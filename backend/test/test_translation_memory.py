@@ -0,0 +1,97 @@
+"""English -> Hindi translation memory: persistence, sentence reuse and hit counting"""
+import json
+import os
+import subprocess
+import sys
+
+import summarizer_service
+from translation_memory import TranslationMemory, split_sentences
+
+
+def test_pairs_persist_and_lookups_ignore_whitespace(tmp_path):
+    path = str(tmp_path / 'memory.jsonl')
+    TranslationMemory(path).add_many({'Open  the menu.': 'मेनू खोलें।', 'Go back.': 'वापस जाएं।'})
+    memory = TranslationMemory(path)
+    assert memory.get('Open the menu.') == 'मेनू खोलें।'
+    assert memory.get('Go   back.') == 'वापस जाएं।'
+    assert memory.stats()['entries'] == 2
+
+
+def test_torn_lines_are_skipped(tmp_path):
+    path = tmp_path / 'memory.jsonl'
+    path.write_text('{"en": "Hi.", "hi": "नमस्ते।"}\n{"en": "Bro', encoding='utf-8')
+    assert TranslationMemory(str(path)).stats()['entries'] == 1
+
+
+def test_split_sentences_handles_danda():
+    assert split_sentences('One. Two!  तीन। चार') == ['One.', 'Two!', 'तीन।', 'चार']
+
+
+def test_requests_and_sentences_are_counted_separately(monkeypatch):
+    memory = TranslationMemory()
+    memory.add_many({'Open the menu.': 'मेनू खोलें।', 'Tap Settings.': 'सेटिंग्स पर टैप करें।'})
+    monkeypatch.setattr(summarizer_service, 'translation_memory', memory)
+
+    def fail(*args):
+        raise AssertionError('Gemini should not be called')
+
+    monkeypatch.setattr(summarizer_service, '_generate_content', fail)
+    # Remembered sentences serve single- and multi-sentence requests without Gemini
+    assert summarizer_service._run_steps(summarizer_service._translate_steps('Open the menu.')) == 'मेनू खोलें।'
+    assert summarizer_service._run_steps(summarizer_service._translate_steps(
+        'Open the menu. Tap Settings.')) == 'मेनू खोलें। सेटिंग्स पर टैप करें।'
+
+    monkeypatch.setattr(summarizer_service, '_generate_content', lambda *args: 'वापस जाएं।')
+    summarizer_service._run_steps(summarizer_service._translate_steps('Open the menu. Go back.'))
+
+    stats = memory.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    assert stats['hit_rate'] == 2 / 3
+    assert (stats['sentence_hits'], stats['sentence_misses']) == (4, 1)
+    # Only the new sentence was stored, not the whole answer
+    assert stats['entries'] == 3
+
+
+def test_whole_answers_are_stored_as_aligned_sentences():
+    memory = TranslationMemory()
+    memory.add_sentences('Open the menu. Tap Settings.', 'मेनू खोलें। सेटिंग्स पर टैप करें।')
+    assert memory.get('Tap Settings.') == 'सेटिंग्स पर टैप करें।'
+    assert memory.get('Open the menu. Tap Settings.') is None
+    # Sentences that don't line up one to one aren't guessed at
+    memory.add_sentences('Go back. Then stop.', 'वापस जाएं और रुकें।')
+    assert memory.stats()['entries'] == 2
+
+
+def test_least_recently_used_pairs_are_evicted():
+    memory = TranslationMemory(max_entries=2)
+    memory.add_many({'One.': 'एक।', 'Two.': 'दो।'})
+    memory.get_many(['One.'])
+    memory.add('Three.', 'तीन।')
+    assert memory.get('Two.') is None
+    assert memory.get('One.') == 'एक।' and memory.get('Three.') == 'तीन।'
+    assert memory.stats()['evictions'] == 1
+
+
+def test_file_is_compacted_on_load(tmp_path):
+    path = tmp_path / 'memory.jsonl'
+    memory = TranslationMemory(str(path))
+    for hindi in ('पुराना।', 'नया।'):
+        memory.add('Hello.', hindi)
+    memory.add_many({'One.': 'एक।', 'Two.': 'दो।'})
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 4
+
+    reloaded = TranslationMemory(str(path), max_entries=2)
+    assert reloaded.get('Hello.') is None  # Oldest written, so evicted
+    assert reloaded.get('Two.') == 'दो।'
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['en'] for line in lines] == ['One.', 'Two.']
+    assert TranslationMemory(str(path)).stats()['entries'] == 2
+
+
+def test_default_path_does_not_depend_on_working_directory(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k != 'TRANSLATION_MEMORY_PATH'}
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = backend
+    out = subprocess.run([sys.executable, '-c', 'import summarizer_service as s; print(s.TRANSLATION_MEMORY_PATH)'],
+                         cwd=str(tmp_path), env=env, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == os.path.join(backend, 'translation_memory.jsonl')
@@ -0,0 +1,92 @@
+"""TTS audio relayed from the upstream in chunks and cached only once complete"""
+import pytest
+
+from audio_cache import AudioCache, audio_cache_key
+
+CHUNKS = [b'ID3', b'frame-1', b'frame-2']
+
+
+def test_writer_stops_buffering_past_the_memory_limit():
+    cache = AudioCache(max_memory_bytes=4)
+    writer = cache.writer('key')
+    writer.write(b'abc')
+    writer.write(b'def')
+    writer.commit()
+    assert writer.size == 6
+    assert cache.get_bytes('key') is None
+
+
+class FakeSpeech:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.closed = False
+
+    def iter_bytes(self, chunk_size):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise ConnectionError('upstream reset')
+            yield chunk
+
+
+class FakeOpenAI:
+    """Just enough of the client for audio.speech.with_streaming_response.create"""
+
+    def __init__(self, speech):
+        self.audio = self
+        self.speech = self
+        self.with_streaming_response = self
+        self._speech = speech
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        client = self
+
+        class Upstream:
+            def __enter__(self):
+                return client._speech
+
+            def __exit__(self, *exc):
+                client._speech.closed = True
+
+        return Upstream()
+
+
+@pytest.fixture
+def app(monkeypatch):
+    pytest.importorskip('playsound')
+    import main
+    cache = AudioCache()
+    monkeypatch.setattr(main, 'audio_cache', cache)
+
+    def install(speech):
+        client = FakeOpenAI(speech)
+        monkeypatch.setattr(main, 'openai_client', client)
+        return main.app.test_client(), cache, client
+    return install
+
+
+def test_streamed_audio_is_relayed_then_cached(app):
+    speech = FakeSpeech(CHUNKS)
+    client, cache, upstream = app(speech)
+    response = client.post('/api/tts', json={'text': 'hello', 'stream': True})
+    assert response.status_code == 200
+    assert response.data == b''.join(CHUNKS)
+    key = response.headers['X-Audio-Key']
+    assert key == audio_cache_key('hello', 'alloy', 'gpt-4o-mini-tts')
+    assert cache.get_bytes(key) == b''.join(CHUNKS)
+    assert speech.closed
+
+    # The next request is served from the cache without calling the upstream
+    assert client.post('/api/tts', json={'text': 'hello', 'stream': True}).data == b''.join(CHUNKS)
+    assert upstream.calls == 1
+
+
+def test_interrupted_stream_is_not_cached(app):
+    speech = FakeSpeech(CHUNKS, fail_after=2)
+    client, cache, _ = app(speech)
+    with pytest.raises(ConnectionError):
+        client.post('/api/tts', json={'text': 'hello', 'stream': True}).get_data()
+    assert cache.get_bytes(audio_cache_key('hello', 'alloy', 'gpt-4o-mini-tts')) is None
+    assert speech.closed
@@ -0,0 +1,35 @@
+"""Canned-phrase TTS warm-up, as the server runs it"""
+import logging
+
+import pytest
+
+from audio_cache import AudioCache
+
+pytest.importorskip('playsound')
+import app_services  # noqa: E402
+import tts_warmup  # noqa: E402
+
+
+def test_server_warmup_reports_through_logging(monkeypatch, caplog, capsys):
+    monkeypatch.setattr(app_services, 'TTS_WARMUP', True)
+    cache = AudioCache()
+    monkeypatch.setattr(app_services, 'audio_cache', cache)
+    spoken = []
+
+    def synthesize(text, voice, model):
+        spoken.append(text)
+        return b'ID3'
+
+    with caplog.at_level(logging.INFO, logger='tts_warmup'):
+        app_services.start_tts_warmup(synthesize, background=False)
+    assert spoken
+    messages = [record.getMessage() for record in caplog.records if record.name == 'tts_warmup']
+    assert messages[0].startswith('TTS warm-up: 0/')
+    assert messages[-1].startswith('TTS warm-up finished')
+    # Nothing printed into the JSON log stream
+    assert capsys.readouterr().out == ''
+
+
+def test_cli_reporter_is_print_by_default(capsys):
+    tts_warmup.warm_tts_cache(lambda text, voice, model: b'ID3', AudioCache(), workers=1)
+    assert capsys.readouterr().out.startswith('TTS warm-up: 0/')
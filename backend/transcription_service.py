@@ -0,0 +1,231 @@
+"""
+Bounded worker pool for local Whisper transcription
+A fixed number of worker threads, each with its own model, drain a bounded queue so
+concurrent requests never oversubscribe the CPU; workers can micro-batch queued clips
+"""
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional
+
+import stt
+
+logger = logging.getLogger(__name__)
+
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))
+STT_QUEUE_SIZE = int(os.getenv("STT_QUEUE_SIZE", "8"))
+STT_TIMEOUT = float(os.getenv("STT_TIMEOUT", "30"))
+
+# Micro-batching: a worker waits up to STT_BATCH_WAIT_MS to gather up to
+# STT_BATCH_SIZE queued clips and runs them through one batched pass
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH_SIZE", "1"))
+STT_BATCH_WAIT_MS = float(os.getenv("STT_BATCH_WAIT_MS", "20"))
+
+# Clips longer than one Whisper window can't share a batch slot
+MAX_BATCH_CLIP_SAMPLES = 30 * stt.samplerate
+
+
+class TranscriptionBusy(Exception):
+    """The transcription queue is full"""
+
+
+class TranscriptionTimeout(TimeoutError):
+    """A transcription did not finish within its timeout"""
+
+
+class TranscriptionService:
+    def __init__(self, workers: int = STT_WORKERS, queue_size: int = STT_QUEUE_SIZE,
+                 model_factory: Callable = stt.load_model,
+                 transcribe: Callable = stt.transcribe_bytes, preload: bool = False,
+                 batch_size: int = STT_BATCH_SIZE, batch_wait_ms: float = STT_BATCH_WAIT_MS,
+                 decode: Callable = stt.decode_audio_bytes,
+                 transcribe_batch: Callable = stt.transcribe_batch):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_ms = batch_wait_ms
+        self._model_factory = model_factory
+        self._transcribe = transcribe
+        self._decode = decode
+        self._transcribe_batch = transcribe_batch
+        self.preload = preload
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.busy_workers = 0
+        self.batches = 0
+        self.batched_jobs = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'stt-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self) -> None:
+        # Each worker owns its model; build it now if preloading, else on the first job
+        whisper_model = None
+        if self.preload:
+            try:
+                whisper_model = self._model_factory()
+            except Exception as e:
+                logger.error("Error loading Whisper model", extra={'error': str(e)})
+        while True:
+            # Skip jobs whose caller already timed out
+            jobs = [job for job in self._next_batch() if job[1].set_running_or_notify_cancel()]
+            if not jobs:
+                continue
+            started = time.perf_counter()
+            with self._lock:
+                self.busy_workers += 1
+                self.batches += 1
+                self.batched_jobs += len(jobs)
+                for _, _, enqueued_at in jobs:
+                    wait = started - enqueued_at
+                    self._wait_total += wait
+                    self._wait_max = max(self._wait_max, wait)
+            try:
+                if whisper_model is None:
+                    whisper_model = self._model_factory()
+                if len(jobs) == 1:
+                    jobs[0][1].set_result(self._transcribe(jobs[0][0], whisper_model))
+                else:
+                    self._run_batch(jobs, whisper_model)
+            except Exception as e:
+                for _, future, _ in jobs:
+                    if not future.done():
+                        future.set_exception(e)
+            failed = sum(1 for _, future, _ in jobs if future.exception() is not None)
+            with self._lock:
+                self.busy_workers -= 1
+                self._run_total += time.perf_counter() - started
+                self.completed += len(jobs) - failed
+                self.failed += failed
+
+    def _next_batch(self) -> list:
+        """Block for one job, then gather more until the batch is full or the wait window closes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_wait_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run_batch(self, jobs: list, whisper_model) -> None:
+        decoded = []
+        for audio_bytes, future, _ in jobs:
+            try:
+                audio_data = self._decode(audio_bytes)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            if len(audio_data) > MAX_BATCH_CLIP_SAMPLES:
+                # Too long for a single window, transcribe it on its own
+                try:
+                    future.set_result(self._transcribe(audio_bytes, whisper_model))
+                except Exception as e:
+                    future.set_exception(e)
+                continue
+            decoded.append((audio_data, future))
+        if not decoded:
+            return
+        if len(decoded) == 1:
+            texts = [stt.transcribe_audio(decoded[0][0], whisper_model)]
+        else:
+            texts = self._transcribe_batch([audio for audio, _ in decoded], whisper_model, len(decoded))
+        for (_, future), text in zip(decoded, texts):
+            future.set_result(text)
+
+    def submit(self, audio_bytes: bytes) -> Future:
+        """Queue audio for transcription, raising TranscriptionBusy if the queue is full"""
+        future = Future()
+        try:
+            self._queue.put_nowait((audio_bytes, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise TranscriptionBusy("Transcription queue is full")
+        return future
+
+    def transcribe(self, audio_bytes: bytes, timeout: Optional[float] = STT_TIMEOUT) -> str:
+        """Transcribe audio bytes on the pool, waiting at most timeout seconds"""
+        future = self.submit(audio_bytes)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise TranscriptionTimeout(f"Transcription did not finish within {timeout}s")
+
+    async def transcribe_async(self, audio_bytes: bytes, timeout: Optional[float] = STT_TIMEOUT) -> str:
+        """transcribe() for the event loop: awaits the pool instead of blocking a thread"""
+        future = self.submit(audio_bytes)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise TranscriptionTimeout(f"Transcription did not finish within {timeout}s")
+
+    def stats(self) -> Dict[str, any]:
+        """Return queue depth, wait-time and outcome counters"""
+        with self._lock:
+            started = self.batched_jobs
+            return {
+                'workers': self.workers,
+                'busy_workers': self.busy_workers,
+                'queue_depth': self._queue.qsize(),
+                'queue_size': self.queue_size,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'batch_size': self.batch_size,
+                'avg_batch_size': self.batched_jobs / self.batches if self.batches else 0.0,
+                'avg_wait_ms': self._wait_total / started * 1000 if started else 0.0,
+                'max_wait_ms': self._wait_max * 1000,
+                'avg_batch_run_ms': self._run_total / self.batches * 1000 if self.batches else 0.0,
+            }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    # Worker threads (and their models) don't survive fork; start a fresh pool on demand
+    global _service, _service_lock
+    _service = None
+    _service_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_transcription_service(preload: bool = False) -> TranscriptionService:
+    """Return the shared transcription service, starting its workers on first call"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = TranscriptionService(preload=preload)
+    return _service
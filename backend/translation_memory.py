@@ -0,0 +1,158 @@
+"""
+Translation memory for English to Hindi
+Stores sentence pairs in an append-only JSON lines file that is memory-mapped and compacted
+at startup, keeping the most recently used max_entries pairs
+"""
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Sentence boundaries: ., !, ? or the Devanagari danda followed by whitespace
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?।])\s+')
+
+
+def normalize(text: str) -> str:
+    """Collapse whitespace so lookups ignore formatting differences"""
+    return ' '.join(text.split())
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, dropping empty pieces"""
+    return [s for s in SENTENCE_SPLIT.split(normalize(text)) if s]
+
+
+class TranslationMemory:
+    def __init__(self, path: Optional[str] = None, max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        # normalized English -> Hindi, least recently used first
+        self._pairs = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        # Per translation request (served without Gemini or not) and per sentence looked up
+        self.hits = 0
+        self.misses = 0
+        self.sentence_hits = 0
+        self.sentence_misses = 0
+        if path:
+            self._load()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        # Don't inherit a lock some parent thread was holding when the process forked
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        lines = 0
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b''):
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        key = normalize(entry['en'])
+                        self._pairs[key] = entry['hi']
+                        self._pairs.move_to_end(key)
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Skip a torn or malformed line
+        self._evict()
+        if lines > len(self._pairs):
+            self._compact()
+
+    def _compact(self) -> None:
+        # Rewrite the file with one line per kept pair; written to a temp file and renamed
+        # so a crash never leaves it half-written
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps({'en': en, 'hi': hi}, ensure_ascii=False) + '\n' for en, hi in self._pairs.items())
+            os.replace(tmp_path, self.path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    def _evict(self) -> None:
+        # Caller holds the lock (or is loading)
+        while self.max_entries > 0 and len(self._pairs) > self.max_entries:
+            self._pairs.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, english: str) -> Optional[str]:
+        """Return the stored Hindi translation for english, if any (not counted in stats)"""
+        with self._lock:
+            return self._pairs.get(normalize(english))
+
+    def get_many(self, sentences: List[str]) -> Dict[str, Optional[str]]:
+        """Look up each sentence, counting sentence hits and misses"""
+        with self._lock:
+            found = {}
+            for sentence in sentences:
+                key = normalize(sentence)
+                found[sentence] = self._pairs.get(key)
+                if found[sentence] is not None:
+                    self._pairs.move_to_end(key)
+            misses = sum(1 for hindi in found.values() if hindi is None)
+            self.sentence_hits += len(found) - misses
+            self.sentence_misses += misses
+            return found
+
+    def record_request(self, hit: bool) -> None:
+        """Count one translation request as served entirely from memory or not"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def add(self, english: str, hindi: str) -> None:
+        """Remember a translation pair and append it to the backing file"""
+        self.add_many({english: hindi})
+
+    def add_sentences(self, english: str, hindi: str) -> None:
+        """Remember a whole translation as sentence pairs, if its sentences line up one to one"""
+        english_sentences = split_sentences(english)
+        hindi_sentences = split_sentences(hindi)
+        if english_sentences and len(english_sentences) == len(hindi_sentences):
+            self.add_many(dict(zip(english_sentences, hindi_sentences)))
+
+    def add_many(self, pairs: Dict[str, str]) -> None:
+        """Remember several translation pairs with a single file append"""
+        lines = []
+        with self._lock:
+            for english, hindi in pairs.items():
+                key = normalize(english)
+                if not key or not hindi or self._pairs.get(key) == hindi:
+                    continue
+                self._pairs[key] = hindi
+                self._pairs.move_to_end(key)
+                lines.append(json.dumps({'en': key, 'hi': hindi}, ensure_ascii=False) + '\n')
+            self._evict()
+            if self.path and lines:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+
+    def stats(self) -> Dict[str, any]:
+        """Return lookup counters and entry count"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            sentence_lookups = self.sentence_hits + self.sentence_misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'sentence_hits': self.sentence_hits,
+                'sentence_misses': self.sentence_misses,
+                'sentence_hit_rate': self.sentence_hits / sentence_lookups if sentence_lookups else 0.0,
+                'entries': len(self._pairs),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions,
+                'persistent': self.path is not None,
+            }
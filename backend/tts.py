@@ -14,38 +14,38 @@ if not API_KEY:
 client = OpenAI(api_key=API_KEY)
 
 
+# Hindi Unicode range (Devanagari script)
+hindi_pattern = re.compile(r'[\u0900-\u097F]')
+
+# Common Hindi words in English (more specific patterns)
+# Removed single-letter words that cause false positives in English
+hindi_words = [
+    'hindi', 'hindi mein', 'hindi me', 'hindi mein bolo', 'hindi me bolo',
+    'hindi translate', 'hindi me translate', 'hindi mein translate',
+    'bolo', 'batao', 'kya', 'kaise', 'kahan', 'kab', 'kyun', 'kisne',
+    'main', 'tum', 'aap', 'hum', 'vo', 'ye', 'wo', 'is', 'us',
+    'par', 'se', 'ko', 'ka', 'ki', 'ke', 'mein', 'pe', 'tak',
+    'hindi me kaho', 'hindi mein kaho', 'hindi me batao', 'hindi mein batao',
+    'speak in hindi', 'talk in hindi'
+]
+
+# All words in one word-boundary alternation, longest first
+hindi_words_pattern = re.compile(
+    r'\b(?:' + '|'.join(re.escape(word) for word in sorted(hindi_words, key=len, reverse=True)) + r')\b'
+)
+
+
 def detect_hindi_in_text(text: str) -> bool:
     """Detect if text contains Hindi words or characters"""
     if not text:
         return False
     
-    # Check for Hindi Unicode range (Devanagari script)
-    hindi_pattern = re.compile(r'[\u0900-\u097F]')
-    
-    # Check for common Hindi words in English (more specific patterns)
-    # Removed single-letter words that cause false positives in English
-    hindi_words = [
-        'hindi', 'hindi mein', 'hindi me', 'hindi mein bolo', 'hindi me bolo',
-        'hindi translate', 'hindi me translate', 'hindi mein translate',
-        'bolo', 'batao', 'kya', 'kaise', 'kahan', 'kab', 'kyun', 'kisne',
-        'main', 'tum', 'aap', 'hum', 'vo', 'ye', 'wo', 'is', 'us',
-        'par', 'se', 'ko', 'ka', 'ki', 'ke', 'mein', 'pe', 'tak',
-        'hindi me kaho', 'hindi mein kaho', 'hindi me batao', 'hindi mein batao',
-        'speak in hindi', 'talk in hindi'
-    ]
-    
     # Check for Hindi characters
     if hindi_pattern.search(text):
         return True
     
     # Check for Hindi words (case insensitive, word boundaries)
-    text_lower = text.lower()
-    for word in hindi_words:
-        # Use word boundaries to avoid false positives
-        if re.search(r'\b' + re.escape(word) + r'\b', text_lower):
-            return True
-    
-    return False
+    return hindi_words_pattern.search(text.lower()) is not None
 
 
 def synthesize_speech(text: str, voice: str = "alloy", model: str = "gpt-4o-mini-tts", out_path: str = "speech.mp3", language: str = "en") -> str:
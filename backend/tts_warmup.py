@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Pre-warm the TTS audio cache with the fixed suggestion phrases
+Synthesizes every canned phrase in each configured voice so first requests after a deploy hit the cache
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Tuple
+
+from audio_cache import AudioCache, audio_cache_key
+from command_processor import command_processor
+from tts import detect_hindi_in_text
+
+TTS_WARMUP_VOICES = [v.strip() for v in os.getenv("TTS_WARMUP_VOICES", "alloy").split(',') if v.strip()]
+TTS_WARMUP_MODEL = os.getenv("TTS_WARMUP_MODEL", "gpt-4o-mini-tts")
+TTS_WARMUP_WORKERS = int(os.getenv("TTS_WARMUP_WORKERS", "4"))
+
+
+def warmup_jobs(voices: List[str], model: str) -> List[Tuple[str, str, str]]:
+    """(text, voice, model) for every canned phrase, voiced the way /api/tts would voice it"""
+    jobs = []
+    for text in command_processor.all_suggestions():
+        # /api/tts always switches Hindi text to the nova voice
+        for voice in (["nova"] if detect_hindi_in_text(text) else voices):
+            jobs.append((text, voice, model))
+    return list(dict.fromkeys(jobs))
+
+
+def warm_tts_cache(synthesize: Callable[[str, str, str], bytes], cache: AudioCache,
+                   voices: List[str] = None, model: str = None, workers: int = None,
+                   report: Callable[[str], None] = print) -> dict:
+    """Synthesize every missing canned phrase in parallel and return a summary"""
+    jobs = warmup_jobs(voices or TTS_WARMUP_VOICES, model or TTS_WARMUP_MODEL)
+    todo = [job for job in jobs if not cache.contains(audio_cache_key(*job))]
+    summary = {'total': len(jobs), 'cached': len(jobs) - len(todo), 'synthesized': 0, 'failed': 0}
+    report(f"TTS warm-up: {summary['cached']}/{len(jobs)} phrases already cached, synthesizing {len(todo)}")
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, workers or TTS_WARMUP_WORKERS)) as pool:
+        futures = {pool.submit(synthesize, *job): job for job in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            text, voice, _ = futures[future]
+            try:
+                future.result()
+                summary['synthesized'] += 1
+                report(f"  [{done}/{len(todo)}] {voice}: {text[:50]}")
+            except Exception as e:
+                summary['failed'] += 1
+                report(f"  [{done}/{len(todo)}] {voice}: FAILED ({e})")
+
+    report(f"TTS warm-up finished in {time.time() - start:.1f}s: "
+           f"{summary['synthesized']} synthesized, {summary['failed']} failed")
+    return summary
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-warm the TTS cache with canned suggestion phrases")
+    parser.add_argument("--voices", default=','.join(TTS_WARMUP_VOICES), help="Comma-separated voices")
+    parser.add_argument("--model", default=TTS_WARMUP_MODEL, help="TTS model")
+    parser.add_argument("--workers", type=int, default=TTS_WARMUP_WORKERS, help="Parallel synthesis requests")
+    args = parser.parse_args()
+
+    from main import audio_cache, openai_client, synthesize_mp3
+    if openai_client is None:
+        raise SystemExit("OpenAI not configured")
+    result = warm_tts_cache(synthesize_mp3, audio_cache,
+                            voices=[v.strip() for v in args.voices.split(',') if v.strip()],
+                            model=args.model, workers=args.workers)
+    raise SystemExit(1 if result['failed'] else 0)